@@ -0,0 +1,187 @@
+import json
+import re
+
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from prompts import JOB_ROLES
+
+# Structured view of the LLM's resume analysis. Skills and role matches live in
+# their own indexed tables so candidate search is a range scan ranked by
+# score rather than a LIKE over free text.
+
+_JSON_OBJECT = re.compile(r"\{.*\}", re.S)
+_JSON_ARRAY = re.compile(r"\[.*\]", re.S)
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+MAX_SKILL_LENGTH = 100
+_NOT_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _load_json(text: str, pattern):
+    """First JSON value of the expected shape in an LLM reply, or None."""
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    match = pattern.search(text)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except ValueError:
+        return None
+
+
+def _as_list(value) -> list:
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list):
+        return []
+    items = []
+    for item in value:
+        item = str(item).strip()
+        if item and item not in items:
+            items.append(item[:MAX_SKILL_LENGTH])
+    return items
+
+
+def _as_int(value) -> int:
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _NUMBER.search(str(value or ""))
+    return int(float(match.group())) if match else 0
+
+
+def parse_skills_analysis(text: str) -> dict:
+    """Candidate profile from the skills-analysis reply; missing parts come back empty."""
+    data = _load_json(text, _JSON_OBJECT)
+    if not isinstance(data, dict):
+        data = {}
+    education = data.get("education") or ""
+    if isinstance(education, list):
+        education = "; ".join(str(e) for e in education)
+    return {
+        "name": str(data.get("name") or "").strip()[:255],
+        "experience_years": _as_int(data.get("experience_years")),
+        "technical_skills": _as_list(data.get("technical_skills")),
+        "soft_skills": _as_list(data.get("soft_skills")),
+        "education": str(education),
+        "previous_roles": _as_list(data.get("previous_roles")),
+    }
+
+
+def parse_job_matches(text: str) -> list:
+    """[{"role", "score", "fit"}] from the job-matching reply, best match first."""
+    data = _load_json(text, _JSON_ARRAY)
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        return []
+    matches = {}
+    for item in data:
+        if not isinstance(item, dict) or not item.get("role"):
+            continue
+        role = normalize_role(str(item["role"]))
+        if not role:
+            continue
+        score = max(0, min(100, _as_int(item.get("match"))))
+        if role not in matches or score > matches[role]["score"]:
+            matches[role] = {"role": role, "score": score, "fit": str(item.get("fit") or "")[:20]}
+    return sorted(matches.values(), key=lambda m: m["score"], reverse=True)
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(skill.lower().split())
+
+
+def _role_key(role: str) -> str:
+    return _NOT_ALNUM.sub("", role.lower())
+
+
+# "Front-end developer", "frontend  Developer" -> "frontend developer"
+_KNOWN_ROLES = {_role_key(role): normalize_skill(role) for role, _ in JOB_ROLES}
+
+
+def normalize_role(role: str) -> str:
+    """Lower-case role name as stored and searched; spellings of a known job role map onto it."""
+    return _KNOWN_ROLES.get(_role_key(role), normalize_skill(role))[:MAX_SKILL_LENGTH]
+
+
+def index_candidate(cursor, resume_id: int, user_id: int, profile: dict, matches: list):
+    """(Re)write the skill and role-match rows of one resume; the caller commits."""
+    cursor.execute("DELETE FROM candidate_skills WHERE resume_id=%s", (resume_id,))
+    cursor.execute("DELETE FROM candidate_roles WHERE resume_id=%s", (resume_id,))
+    skills = []
+    for kind in ("technical", "soft"):
+        seen = set()
+        for skill in profile[f"{kind}_skills"]:
+            key = normalize_skill(skill)
+            if key and key not in seen:
+                seen.add(key)
+                skills.append((resume_id, user_id, key, kind))
+    if skills:
+        cursor.executemany(
+            "INSERT INTO candidate_skills (resume_id, user_id, skill, kind) VALUES (%s, %s, %s, %s)", skills
+        )
+    if matches:
+        cursor.executemany(
+            "INSERT INTO candidate_roles (resume_id, user_id, role, score, fit) VALUES (%s, %s, %s, %s, %s)",
+            [(resume_id, user_id, m["role"], m["score"], m["fit"]) for m in matches],
+        )
+
+
+def profile_columns(profile: dict) -> dict:
+    """Values for the denormalized profile columns on resumes."""
+    return {
+        "candidate_name": profile["name"],
+        "experience_years": profile["experience_years"],
+        "technical_skills": ", ".join(profile["technical_skills"]),
+        "soft_skills": ", ".join(profile["soft_skills"]),
+        "education": profile["education"],
+        "previous_roles": ", ".join(profile["previous_roles"]),
+    }
+
+
+def search(db, user_id: int, job_role: str, skills: list = None, min_experience: int = 0,
+           min_score: int = 0, limit: int = 25, cursor: str = None) -> dict:
+    """Candidates for a role ranked by match score, then newest resume first.
+
+    Every requested skill must be present. The cursor is keyed on
+    (score, resume_id), matching the candidate_roles index.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where = ["cr.user_id = %s", "cr.role = %s", "cr.score >= %s", "r.experience_years >= %s"]
+    params = [user_id, normalize_role(job_role), min_score, min_experience]
+
+    wanted = sorted({normalize_skill(s) for s in (skills or []) if s.strip()})
+    if wanted:
+        where.append(
+            "cr.resume_id IN (SELECT resume_id FROM candidate_skills WHERE user_id = %s AND skill IN ("
+            + ", ".join(["%s"] * len(wanted))
+            + ") GROUP BY resume_id HAVING COUNT(DISTINCT skill) = %s)"
+        )
+        params.extend([user_id, *wanted, len(wanted)])
+    if cursor:
+        score, resume_id = decode_cursor(cursor)
+        score = _as_int(score)
+        where.append("(cr.score < %s OR (cr.score = %s AND cr.resume_id < %s))")
+        params.extend([score, score, resume_id])
+
+    sql = (
+        "SELECT r.id, r.filename, r.candidate_name, r.experience_years, r.technical_skills, r.soft_skills, "
+        "r.education, r.previous_roles, r.job_matches, r.status, r.created_at, cr.score AS match_score, cr.fit "
+        "FROM candidate_roles cr JOIN resumes r ON r.id = cr.resume_id "
+        f"WHERE {' AND '.join(where)} ORDER BY cr.score DESC, cr.resume_id DESC LIMIT %s"
+    )
+    params.append(limit + 1)
+
+    db_cursor = db.cursor(dictionary=True)
+    db_cursor.execute(sql, params)
+    rows = db_cursor.fetchall()
+    db_cursor.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["match_score"], rows[-1]["id"])
+    return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+CONTENT_STORE_DB = os.getenv("CONTENT_STORE_DB", "content_store.db")
+CHUNK_SIZE = 1024 * 1024
+OBJECTS_DIR = ".objects"
+
+
+def save_stream(source, upload_dir: str, filename: str):
+    """Stream a file object to upload_dir/filename, hashing it on the way.
+
+    Every distinct content is also hard-linked under upload_dir/.objects/<sha256>;
+    a duplicate upload is then linked to that blob instead of storing the
+    bytes twice. Replacing a name never touches the blob it pointed at.
+    Returns (file_path, sha256).
+    """
+    objects_dir = os.path.join(upload_dir, OBJECTS_DIR)
+    os.makedirs(objects_dir, exist_ok=True)
+    file_path = os.path.join(upload_dir, filename)
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                buffer.write(chunk)
+        sha256 = digest.hexdigest()
+
+        blob_path = os.path.join(objects_dir, sha256)
+        if os.path.exists(blob_path):
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                os.link(blob_path, file_path)
+                os.remove(tmp_path)
+                return file_path, sha256
+            except OSError:
+                pass  # no hard links on this filesystem: keep the copy we just wrote
+        else:
+            try:
+                os.link(tmp_path, blob_path)
+            except OSError:
+                pass
+
+        os.replace(tmp_path, file_path)
+        return file_path, sha256
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ContentStore:
+    """Content-addressed store: sha256 -> extracted text, encoding, page count and analysis results.
+
+    Text extracted with a character limit is remembered together with that
+    limit, so it only answers lookups that need no more than it holds.
+    """
+
+    def __init__(self, db_path: str = CONTENT_STORE_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS contents (
+                sha256 TEXT PRIMARY KEY,
+                text TEXT,
+                text_limit INTEGER,
+                encoding TEXT,
+                page_count INTEGER,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                sha256 TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (sha256, kind)
+            )
+        """)
+        self._db.commit()
+        self.counters = {"text_hits": 0, "text_misses": 0, "analysis_hits": 0, "analysis_misses": 0}
+
+    def get_text(self, sha256: str, max_chars: int = None):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, text_limit FROM contents WHERE sha256=?", (sha256,)
+            ).fetchone()
+            hit = (
+                row is not None
+                and row["text"] is not None
+                and (row["text_limit"] is None or (max_chars is not None and max_chars <= row["text_limit"]))
+            )
+            self.counters["text_hits" if hit else "text_misses"] += 1
+        if not hit:
+            return None
+        return row["text"][:max_chars] if max_chars is not None else row["text"]
+
+    def put_text(self, sha256: str, text: str, meta: dict = None, max_chars: int = None):
+        meta = meta or {}
+        with self._lock:
+            row = self._db.execute("SELECT text_limit, text FROM contents WHERE sha256=?", (sha256,)).fetchone()
+            # Never replace full text with a truncated copy
+            if row is not None and row["text"] is not None and row["text_limit"] is None and max_chars is not None:
+                return
+            self._db.execute(
+                "INSERT INTO contents (sha256, text, text_limit, encoding, page_count, created_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(sha256) DO UPDATE SET text=excluded.text, text_limit=excluded.text_limit, "
+                "encoding=excluded.encoding, page_count=excluded.page_count",
+                (sha256, text, max_chars, meta.get("encoding"), meta.get("page_count"), time.time()),
+            )
+            self._db.commit()
+
+    def get_analysis(self, sha256: str, kind: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM analyses WHERE sha256=? AND kind=?", (sha256, kind)
+            ).fetchone()
+            self.counters["analysis_hits" if row else "analysis_misses"] += 1
+        return json.loads(row["result"]) if row else None
+
+    def put_analysis(self, sha256: str, kind: str, result: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analyses (sha256, kind, result, created_at) VALUES (?, ?, ?, ?)",
+                (sha256, kind, json.dumps(result, default=str), time.time()),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+content_store = ContentStore()
@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", "roylobo8"),
+    "database": os.getenv("DB_NAME", "genai_portal"),
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Idle connections older than this are pinged before being handed out
+DB_HEALTHCHECK_AFTER = float(os.getenv("DB_HEALTHCHECK_AFTER", "30"))
+
+
+class DatabaseUnavailable(Exception):
+    """No connection could be handed out (pool exhausted or server unreachable)."""
+
+
+def _mysql_connect():
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def _mysql_ping(conn) -> bool:
+    try:
+        conn.ping(reconnect=False)
+        return True
+    except Exception:
+        return False
+
+
+def _generic_ping(conn) -> bool:
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+        cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections.
+
+    Connections are created lazily up to `size`, handed out most-recently-used
+    first, pinged if they sat idle for a while, and rolled back on return so no
+    transaction leaks into the next request. Works with any DB-API factory,
+    e.g. sqlite3.connect for a local stand-in.
+    """
+
+    def __init__(
+        self,
+        connect=_mysql_connect,
+        size: int = DB_POOL_SIZE,
+        timeout: float = DB_POOL_TIMEOUT,
+        ping=None,
+        healthcheck_after: float = DB_HEALTHCHECK_AFTER,
+    ):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping = ping or (_mysql_ping if connect is _mysql_connect else _generic_ping)
+        self.healthcheck_after = healthcheck_after
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.counters = {"created": 0, "checkouts": 0, "discarded": 0, "timeouts": 0}
+
+    def checkout(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.counters["timeouts"] += 1
+            raise DatabaseUnavailable(f"No database connection available within {self.timeout}s")
+        try:
+            conn = self._take_idle()
+            if conn is None:
+                conn = self.connect()
+                with self._lock:
+                    self.counters["created"] += 1
+        except Exception as e:
+            self._slots.release()
+            raise DatabaseUnavailable(str(e)) from e
+        with self._lock:
+            self.counters["checkouts"] += 1
+        return conn
+
+    def checkin(self, conn):
+        try:
+            conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "size": self.size, "idle": self._idle.qsize()}
+
+    def _take_idle(self):
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - idle_since < self.healthcheck_after or self.ping(conn):
+                return conn
+            self._discard(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self.counters["discarded"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+db_pool = ConnectionPool()
+
+
+def db_connection():
+    """Context-managed checkout for code outside request handlers."""
+    return db_pool.connection()
+
+
+def get_db():
+    """FastAPI dependency: one pooled connection per request, returned afterwards."""
+    with db_pool.connection() as conn:
+        yield conn
@@ -0,0 +1,150 @@
+import re
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+_MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+_MONTH = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?"
+_NUMBER = r"\d+(?:,\d+)*(?:\.\d+)?"
+# Alphabetic codes must start a word: "hours 5" is not "rs 5", "customers 1" is not "rs 1"
+_CURRENCY_BEFORE = r"₹|\$|€|£|\b(?:Rs\.?|INR|USD|EUR|GBP)"
+_CURRENCY_AFTER = r"INR|USD|EUR|GBP|rupees|dollars|euros|pounds"
+
+_NUMBER_RE = re.compile(_NUMBER)
+
+CURRENCIES = {
+    "₹": "INR", "rs": "INR", "rs.": "INR", "inr": "INR", "rupees": "INR",
+    "$": "USD", "usd": "USD", "dollars": "USD",
+    "€": "EUR", "eur": "EUR", "euros": "EUR",
+    "£": "GBP", "gbp": "GBP", "pounds": "GBP",
+}
+
+# One pattern, one scan. Alternatives are tried in order at each position and
+# a match consumes its text, so digits inside invoice numbers and dates can
+# no longer be reported as amounts.
+ENTITY_PATTERN = re.compile(
+    rf"""
+    (?P<invoice>\bINV[-/]\d{{4}}[-/]\d{{3}}\b)
+    | (?P<iso_date>\b(?P<iso_y>\d{{4}})-(?P<iso_m>\d{{1,2}})-(?P<iso_d>\d{{1,2}})\b)
+    | (?P<num_date>\b(?P<num_d>\d{{1,2}})[/-](?P<num_m>\d{{1,2}})[/-](?P<num_y>\d{{2,4}})\b)
+    | (?P<dmy_date>\b(?P<dmy_d>\d{{1,2}})(?:st|nd|rd|th)?\s(?P<dmy_m>{_MONTH}),?\s(?P<dmy_y>\d{{2,4}})\b)
+    | (?P<mdy_date>\b(?P<mdy_m>{_MONTH})\s(?P<mdy_d>\d{{1,2}})(?:st|nd|rd|th)?,?\s(?P<mdy_y>\d{{4}})\b)
+    | (?P<labelled>\b(?:amount(?:\sdue)?|total|balance\sdue|sum)\s*[:=-]?\s*
+        (?P<lab_cur>{_CURRENCY_BEFORE})?\s?(?P<lab_num>{_NUMBER}))
+    | (?P<cur_amount>(?P<pre_cur>{_CURRENCY_BEFORE})\s?(?P<pre_num>{_NUMBER}))
+    | (?P<amount_cur>\b(?P<post_num>{_NUMBER})\s?(?P<post_cur>{_CURRENCY_AFTER})\b)
+    | (?P<grouped>\b\d{{1,3}}(?:,\d{{2,3}})+(?:\.\d{{1,2}})?\b)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+@dataclass
+class Entity:
+    """One extracted entity. value is a Decimal (amount), a date, or the invoice number."""
+
+    kind: str
+    text: str
+    value: object
+    start: int
+    end: int
+    currency: str = None
+
+    def to_dict(self) -> dict:
+        value = self.value.isoformat() if isinstance(self.value, date) else str(self.value)
+        out = {"type": self.kind, "text": self.text, "value": value, "start": self.start, "end": self.end}
+        if self.currency:
+            out["currency"] = self.currency
+        return out
+
+
+def parse_decimal(number: str):
+    try:
+        return Decimal(number.replace(",", "").rstrip("."))
+    except InvalidOperation:
+        return None
+
+
+def _make_date(year: str, month, day: str, ambiguous: bool = False):
+    """date from its parts, None if they are out of range.
+
+    ambiguous marks numeric d/m/y text: day-first is the house format, but
+    when only the month-first reading is valid that one is used. ISO dates
+    are never reinterpreted.
+    """
+    year = int(year)
+    if year < 100:
+        year += 2000
+    if isinstance(month, str) and not month.isdigit():
+        month = _MONTHS.index(month[:3].lower()) + 1
+    month, day = int(month), int(day)
+    if ambiguous and month > 12 and day <= 12:
+        month, day = day, month
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _entity_from_match(match):
+    start, end = match.span()
+    if match.group("invoice"):
+        return Entity("invoice_number", match.group("invoice"), match.group("invoice").upper(), start, end)
+    for prefix in ("iso", "num", "dmy", "mdy"):
+        if match.group(f"{prefix}_date"):
+            value = _make_date(match.group(f"{prefix}_y"), match.group(f"{prefix}_m"), match.group(f"{prefix}_d"),
+                               ambiguous=prefix == "num")
+            return Entity("date", match.group(), value, start, end) if value else None
+    if match.group("labelled"):
+        number, currency = match.group("lab_num"), match.group("lab_cur")
+        start, end = match.start("lab_cur") if currency else match.start("lab_num"), match.end("lab_num")
+    elif match.group("cur_amount"):
+        number, currency = match.group("pre_num"), match.group("pre_cur")
+    elif match.group("amount_cur"):
+        number, currency = match.group("post_num"), match.group("post_cur")
+    else:
+        number, currency = match.group("grouped"), None
+    value = parse_decimal(number)
+    if value is None:
+        return None
+    text = match.string[start:end].strip()
+    return Entity("amount", text, value, start, end, CURRENCIES.get(currency.lower()) if currency else None)
+
+
+class EntityExtractor:
+    """Amounts, dates and invoice numbers from one pass of a precompiled pattern."""
+
+    def __init__(self, pattern=ENTITY_PATTERN):
+        self.pattern = pattern
+
+    def extract(self, text: str) -> list:
+        """Typed entities in text order."""
+        entities = []
+        for match in self.pattern.finditer(text or ""):
+            entity = _entity_from_match(match)
+            if entity is not None:
+                entities.append(entity)
+        return entities
+
+
+entity_extractor = EntityExtractor()
+
+
+def entities_dict(entities: list) -> dict:
+    """JSON-ready form kept compatible with the original keys.
+
+    amounts holds the matched amount text, dates are ISO dates, and spans
+    carries every entity with its normalized value, currency and offsets.
+    """
+    return {
+        "amounts": [e.text for e in entities if e.kind == "amount"],
+        "dates": [e.value.isoformat() for e in entities if e.kind == "date"],
+        "invoice_numbers": [e.value for e in entities if e.kind == "invoice_number"],
+        "spans": [e.to_dict() for e in entities],
+    }
+
+
+def parse_amount(text: str):
+    """Decimal value of an amount string such as "₹75,000" or "Rs. 1,200.50"; None if there is none."""
+    match = _NUMBER_RE.search(text or "")
+    return parse_decimal(match.group()) if match else None
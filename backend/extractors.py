@@ -1,5 +1,8 @@
-import re
 from utils import call_llama3
+from task_graph import TaskGraph
+from entity_extraction import entity_extractor
+from fast_path import run_tiered, vendor_from_text, parties_from_text
+from prompts import vendor_extraction_prompt, parties_extraction_prompt, support_classification_prompt, hr_feedback_prompt
 
 # ------------------ FINANCE ------------------ #
 def extract_finance_fields(text: str) -> dict:
@@ -8,19 +11,19 @@ def extract_finance_fields(text: str) -> dict:
     amount = None
     due_date = None
 
-    # Regex for amount
-    match_amount = re.search(r"(?:₹|\$)?\s?\d+(?:,\d{3})*(?:\.\d{2})?", text)
-    if match_amount:
-        amount = match_amount.group()
+    # Amount and due date from a single entity scan
+    for entity in entity_extractor.extract(text):
+        if amount is None and entity.kind == "amount":
+            amount = entity.text
+        elif due_date is None and entity.kind == "date":
+            due_date = entity.value.isoformat()
 
-    # Regex for due date
-    match_date = re.search(r"\b(?:\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2} \w+ \d{4})\b", text)
-    if match_date:
-        due_date = match_date.group()
-
-    # Vendor via LLM (more accurate)
-    vendor_prompt = f"Extract the vendor/supplier name from this invoice:\n{text}\nVendor:"
-    vendor = call_llama3(vendor_prompt)
+    # Vendor from a labelled line when the invoice has one, otherwise via LLM
+    vendor = run_tiered(
+        "finance_vendor",
+        lambda: vendor_from_text(text),
+        lambda: call_llama3(vendor_extraction_prompt(text), task="extraction"),
+    )
 
     return {
         "vendor": vendor,
@@ -31,30 +34,31 @@ def extract_finance_fields(text: str) -> dict:
 # ------------------ CUSTOMER SUPPORT ------------------ #
 def extract_support_fields(text: str) -> dict:
     """Extract issue category and priority from complaints."""
-    prompt = f"""Classify the following client complaint:
-    Text: {text}
-    Return JSON with 'category' (Refund/Delay/Delivery/Other) and 'priority' (Low/Medium/High).
-    """
-    response = call_llama3(prompt)
+    response = call_llama3(support_classification_prompt(text), task="classification")
     return {"raw": response}
 
 # ------------------ LEGAL ------------------ #
 def extract_legal_fields(text: str) -> dict:
     """Check for missing clauses in contracts."""
     clauses = ["Termination", "Liability", "Confidentiality"]
-    missing = [c for c in clauses if c.lower() not in text.lower()]
+
+    # Clause scan and the parties LLM call are independent
+    graph = TaskGraph("extract_legal_fields")
+    graph.add("parties", lambda: run_tiered(
+        "legal_parties",
+        lambda: parties_from_text(text),
+        lambda: call_llama3(parties_extraction_prompt(text), task="extraction"),
+    ))
+    graph.add("missing_clauses", lambda: [c for c in clauses if c.lower() not in text.lower()])
+    results = graph.run()
 
     return {
-        "parties": call_llama3(f"Extract parties in this contract:\n{text}\nParties:"),
-        "missing_clauses": missing
+        "parties": results["parties"],
+        "missing_clauses": results["missing_clauses"]
     }
 
 # ------------------ HR ------------------ #
 def extract_hr_fields(text: str) -> dict:
     """Sentiment analysis + category extraction for HR feedback."""
-    prompt = f"""Analyze employee feedback:
-    {text}
-    Return JSON with 'sentiment' (Positive/Negative/Neutral) and 'category' (Workload, Manager support, Pay, Other).
-    """
-    response = call_llama3(prompt)
+    response = call_llama3(hr_feedback_prompt(text), task="classification")
     return {"raw": response}
@@ -0,0 +1,96 @@
+import hashlib
+import re
+
+# Identifiers that differ between otherwise identical tickets
+_VOLATILE = re.compile(
+    r"\S+@\S+\.\w+"                     # email addresses
+    r"|https?://\S+"                    # URLs
+    r"|\b\d{1,3}(?:\.\d{1,3}){3}\b"     # IPv4 addresses
+    r"|\b[\w-]*\d[\w-]*\b",             # anything with a digit: hostnames, ticket and asset ids, times
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"[a-z]+")
+# "cannot", "can't", "won't", "doesn't" -> "not", so the negation survives tokenizing
+_NEGATION = re.compile(r"\bcannot\b|(?:\bca|\bwo|\bsha)?n['\u2019]t\b")
+# Negations are deliberately absent: "cannot connect" and "can connect" are different tickets
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does doing for from had has have having he her his
+how i i'm im if in into is it its just me my of on or our please she so some than that the their them
+then there these they this to too up us was we were what when where which while who why will with would you your
+hi hello thanks thank regards help need issue problem since today yesterday morning still again also getting
+""".split())
+
+SIMHASH_BITS = 64
+
+
+def normalize_issue(text: str) -> list:
+    """Content words of a ticket description, with ids, addresses and filler removed."""
+    text = _NEGATION.sub(" not", _VOLATILE.sub(" ", (text or "").lower()))
+    return [w for w in _WORD.findall(text) if w not in STOPWORDS and len(w) > 1]
+
+
+def features(words: list) -> set:
+    """Words plus adjacent word pairs, so word order counts a little."""
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash; near-duplicate descriptions differ in only a few bits."""
+    weights = [0] * SIMHASH_BITS
+    for feature in features(normalize_issue(text)):
+        h = _hash64(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def bands(fingerprint: int, count: int = 4) -> list:
+    """Split a fingerprint into `count` equal bands.
+
+    Two fingerprints within count - 1 bits of each other agree exactly on
+    at least one band, so indexing bands finds every near-duplicate.
+    """
+    width = SIMHASH_BITS // count
+    mask = (1 << width) - 1
+    return [fingerprint >> (i * width) & mask for i in range(count)]
+
+
+# ------------------- MINHASH -------------------
+_MERSENNE = (1 << 61) - 1
+MINHASH_PERMUTATIONS = 64
+
+
+def _permutations(count: int) -> list:
+    # Fixed seeds so signatures are comparable across processes
+    out = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE
+        out.append((a, b))
+    return out
+
+
+_PERMUTATIONS = _permutations(MINHASH_PERMUTATIONS)
+
+
+def minhash(feature_set: set) -> tuple:
+    """MinHash signature; the share of equal positions estimates Jaccard similarity."""
+    if not feature_set:
+        return ()
+    hashes = [_hash64(f) for f in feature_set]
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def jaccard_estimate(a: tuple, b: tuple) -> float:
+    if not a or not b:
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
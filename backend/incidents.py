@@ -0,0 +1,188 @@
+import itertools
+import os
+import threading
+import time
+
+from fingerprints import features, normalize_issue, minhash, jaccard_estimate, MINHASH_PERMUTATIONS
+
+# Tickets join an incident only while it has seen a ticket within this many seconds
+INCIDENT_WINDOW = float(os.getenv("INCIDENT_WINDOW", str(2 * 3600)))
+# Estimated Jaccard similarity of description features needed to join an incident
+INCIDENT_SIMILARITY = float(os.getenv("INCIDENT_SIMILARITY", "0.5"))
+# LSH banding: MINHASH_PERMUTATIONS = bands * rows. 16 x 4 finds pairs at
+# Jaccard 0.5 with ~65% probability each and pairs at 0.7 with ~99%.
+INCIDENT_LSH_BANDS = int(os.getenv("INCIDENT_LSH_BANDS", "16"))
+# How long a duplicate waits for the first ticket's suggestion
+INCIDENT_WAIT = float(os.getenv("INCIDENT_WAIT", "60"))
+# Descriptions with fewer content words are never clustered
+INCIDENT_MIN_WORDS = int(os.getenv("INCIDENT_MIN_WORDS", "3"))
+# Ticket ids listed per incident; the count is always complete
+INCIDENT_MAX_LISTED = 50
+
+
+class Incident:
+    """A cluster of near-duplicate tickets sharing one suggestion.
+
+    The ticket that opens an incident generates the suggestion and calls
+    resolve(); duplicates arriving meanwhile wait() for it instead of making
+    their own suggestion call. Summaries are not shared: each is written from
+    its own ticket's user context.
+    """
+
+    def __init__(self, incident_id: int, category: str, description: str, signature: tuple):
+        self.id = incident_id
+        self.category = category
+        self.description = description
+        self.signature = signature
+        self.ticket_ids = []
+        self.tickets = 0
+        self.first_seen = self.last_seen = time.time()
+        self.suggestion = None
+        self.failed = False
+        self._ready = threading.Event()
+
+    def resolve(self, suggestion: str):
+        self.suggestion = suggestion
+        self._ready.set()
+
+    @property
+    def resolved(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: float = INCIDENT_WAIT):
+        """The suggestion once the first ticket has it; None on failure or timeout."""
+        if not self._ready.wait(timeout) or self.failed:
+            return None
+        return self.suggestion
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "category": self.category,
+            "description": self.description,
+            "tickets": self.tickets,
+            "ticket_ids": self.ticket_ids[-INCIDENT_MAX_LISTED:],
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "suggestion": self.suggestion,
+        }
+
+
+class IncidentIndex:
+    """In-memory MinHash LSH index over tickets seen within INCIDENT_WINDOW.
+
+    Each incident's signature is split into bands; a new ticket is compared
+    only with incidents sharing at least one band bucket in its category,
+    then joins the most similar one above INCIDENT_SIMILARITY. Incidents go
+    quiet after the window and are dropped, so the index only ever holds
+    the current outage set. Incident ids restart with the process.
+    """
+
+    def __init__(self, window: float = INCIDENT_WINDOW, similarity: float = INCIDENT_SIMILARITY,
+                 bands: int = INCIDENT_LSH_BANDS):
+        if MINHASH_PERMUTATIONS % bands:
+            raise ValueError(f"INCIDENT_LSH_BANDS must divide {MINHASH_PERMUTATIONS}")
+        self.window = window
+        self.similarity = similarity
+        self.bands = bands
+        self.rows = MINHASH_PERMUTATIONS // bands
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._incidents = {}
+        self._buckets = {}
+        self.counters = {"tickets": 0, "clustered": 0, "opened": 0, "expired": 0, "unclustered": 0}
+
+    def _keys(self, category: str, signature: tuple):
+        for band in range(self.bands):
+            yield category, band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _forget(self, incident: Incident):
+        # Caller holds the lock
+        self._incidents.pop(incident.id, None)
+        for key in self._keys(incident.category, incident.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(incident.id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _expire(self, now: float):
+        # Caller holds the lock
+        for incident in [i for i in self._incidents.values() if now - i.last_seen > self.window]:
+            self._forget(incident)
+            self.counters["expired"] += 1
+
+    def assign(self, category: str, description: str):
+        """(incident, opened) for a new ticket; (None, False) when it is too short to cluster.
+
+        opened is True when the ticket starts a new incident, in which case
+        the caller must resolve() it or hand it to abandon().
+        """
+        words = normalize_issue(description)
+        now = time.time()
+        with self._lock:
+            self.counters["tickets"] += 1
+            if len(words) < INCIDENT_MIN_WORDS:
+                self.counters["unclustered"] += 1
+                return None, False
+            self._expire(now)
+            signature = minhash(features(words))
+            candidates = set()
+            for key in self._keys(category, signature):
+                candidates |= self._buckets.get(key, set())
+            best, best_score = None, self.similarity
+            for incident_id in candidates:
+                incident = self._incidents[incident_id]
+                score = jaccard_estimate(signature, incident.signature)
+                if score >= best_score:
+                    best, best_score = incident, score
+            if best is not None:
+                best.tickets += 1
+                best.last_seen = now
+                self.counters["clustered"] += 1
+                return best, False
+            incident = Incident(next(self._ids), category, description, signature)
+            incident.tickets = 1
+            self._incidents[incident.id] = incident
+            for key in self._keys(category, signature):
+                self._buckets.setdefault(key, set()).add(incident.id)
+            self.counters["opened"] += 1
+            return incident, True
+
+    def attach(self, incident: Incident, ticket_id: int):
+        with self._lock:
+            incident.ticket_ids.append(ticket_id)
+            del incident.ticket_ids[:-INCIDENT_MAX_LISTED]
+
+    def abandon(self, incident: Incident):
+        """The opening ticket failed: release waiting duplicates and stop matching against it."""
+        with self._lock:
+            incident.failed = True
+            incident._ready.set()
+            self._forget(incident)
+
+    def get(self, incident_id: int):
+        with self._lock:
+            incident = self._incidents.get(incident_id)
+            return incident.to_dict() if incident else None
+
+    def active(self, category: str = None, min_tickets: int = 1) -> list:
+        """Active incidents, largest first."""
+        with self._lock:
+            self._expire(time.time())
+            incidents = [
+                i.to_dict() for i in self._incidents.values()
+                if i.tickets >= min_tickets and (category is None or i.category == category)
+            ]
+        return sorted(incidents, key=lambda i: (-i["tickets"], -i["last_seen"]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "active": len(self._incidents),
+                "largest": max((i.tickets for i in self._incidents.values()), default=0),
+            }
+
+
+incident_index = IncidentIndex()
@@ -0,0 +1,169 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_DB = os.getenv("JOB_DB", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+
+ACTIVE_STATUSES = ("queued", "running", "retrying")
+
+
+def _pid_alive(pid: int) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Background job runner with a persisted job table.
+
+    Handlers are registered per job kind and called with the job payload as
+    keyword arguments. A handler that raises is retried with exponential
+    backoff up to max_attempts; a handler that returns a dict carrying an
+    "error" key failed deterministically and is not retried. Jobs left
+    active by a dead worker process are picked up again on start().
+    """
+
+    def __init__(
+        self,
+        db_path: str = JOB_DB,
+        workers: int = JOB_WORKERS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_backoff: float = JOB_RETRY_BACKOFF,
+    ):
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                owner_pid INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+        self._db.commit()
+
+    def register(self, kind: str, handler):
+        self.handlers[kind] = handler
+
+    def start(self):
+        """Requeue active jobs whose owning process is gone (crash or restart)."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, owner_pid FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        orphaned = [row for row in rows if row["owner_pid"] == os.getpid() or not _pid_alive(row["owner_pid"])]
+        claimed = [row["id"] for row in orphaned if self._claim(row["id"], row["owner_pid"])]
+        for job_id in claimed:
+            self._executor.submit(self._run, job_id)
+        if claimed:
+            print(f"Requeued {len(claimed)} unfinished jobs")
+
+    def submit(self, kind: str, payload: dict) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, owner_pid, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), os.getpid(), now, now),
+            )
+            self._db.commit()
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        del job["owner_pid"]
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    # ------------------- INTERNALS -------------------
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{k}=?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id=?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def _claim(self, job_id: str, dead_pid) -> bool:
+        """Take over an orphaned job; False if another worker process claimed it first.
+
+        Every worker sharing the job table sees the same dead owner on
+        startup, so the owner is compared and swapped in one statement.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET status='queued', owner_pid=?, updated_at=? "
+                f"WHERE id=? AND owner_pid IS ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                (os.getpid(), time.time(), job_id, dead_pid, *ACTIVE_STATUSES),
+            )
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def _run(self, job_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT kind, payload, attempts FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return
+        attempts = row["attempts"] + 1
+        self._update(job_id, status="running", attempts=attempts)
+
+        try:
+            result = self.handlers[row["kind"]](**json.loads(row["payload"]))
+        except Exception as e:
+            print(f"Job {job_id} ({row['kind']}) attempt {attempts} failed: {str(e)}")
+            if attempts < self.max_attempts:
+                delay = self.retry_backoff * (2 ** (attempts - 1))
+                self._update(job_id, status="retrying", error=str(e))
+                timer = threading.Timer(delay, lambda: self._executor.submit(self._run, job_id))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._update(job_id, status="failed", error=str(e))
+            return
+
+        if isinstance(result, dict) and result.get("error"):
+            self._update(job_id, status="failed", result=json.dumps(result, default=str), error=result["error"])
+        else:
+            self._update(job_id, status="done", result=json.dumps(result, default=str), error=None)
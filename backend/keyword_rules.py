@@ -0,0 +1,88 @@
+import re
+
+# Positions kept per label; counts are always complete
+MAX_POSITIONS = 100
+
+
+def _trie_pattern(words) -> str:
+    """Regex equivalent to an alternation of words, factored as a trie.
+
+    Greedy optional groups make the regex prefer the longest keyword at a
+    given start position, backtracking to shorter ones when it must.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        ends_here = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Case-insensitive substring matching of many keyword sets in one pass.
+
+    Rules are an ordered list of (label, keywords). All keywords are compiled
+    into a single trie-shaped regex inside a lookahead, so every start
+    position is tried once and overlapping occurrences are all seen. The
+    longest keyword found at a position also credits every keyword that is a
+    prefix of it, which keeps plain `keyword in text` semantics exactly.
+    """
+
+    def __init__(self, rules):
+        self.rules = [(label, [k.lower() for k in keywords if k]) for label, keywords in rules]
+        self.labels = [label for label, _ in self.rules]
+        self._labels_of = {}
+        for label, keywords in self.rules:
+            for keyword in keywords:
+                labels = self._labels_of.setdefault(keyword, [])
+                if label not in labels:
+                    labels.append(label)
+        keywords = sorted(self._labels_of)
+        # Keywords matched at a position = the longest one there plus its keyword prefixes
+        self._credits = {
+            keyword: [k for k in keywords if keyword.startswith(k)] for keyword in keywords
+        }
+        self._regex = re.compile("(?=(" + _trie_pattern(keywords) + "))") if keywords else None
+
+    def scan(self, text: str) -> dict:
+        """{label: {"count", "keywords": {keyword: count}, "positions": [(keyword, start)]}} for labels with hits."""
+        hits = {}
+        if not text or self._regex is None:
+            return hits
+        for match in self._regex.finditer(text.lower()):
+            start = match.start()
+            for keyword in self._credits[match.group(1)]:
+                for label in self._labels_of[keyword]:
+                    hit = hits.setdefault(label, {"count": 0, "keywords": {}, "positions": []})
+                    hit["count"] += 1
+                    hit["keywords"][keyword] = hit["keywords"].get(keyword, 0) + 1
+                    if len(hit["positions"]) < MAX_POSITIONS:
+                        hit["positions"].append((keyword, start))
+        return hits
+
+    def first_match(self, text: str, default=None, hits: dict = None):
+        """Precedence policy: the earliest rule with any hit wins, as an if/elif chain would."""
+        hits = self.scan(text) if hits is None else hits
+        for label in self.labels:
+            if label in hits:
+                return label
+        return default
+
+    def best_match(self, text: str, default=None, hits: dict = None):
+        """Scoring policy: the rule with the most keyword occurrences wins; ties go to the earlier rule."""
+        hits = self.scan(text) if hits is None else hits
+        if not hits:
+            return default
+        return max(self.labels, key=lambda label: (hits.get(label, {}).get("count", 0), -self.labels.index(label)))
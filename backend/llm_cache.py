@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "50000"))
+# Empty string disables the on-disk tier
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "llm_cache.db")
+
+
+def make_cache_key(model: str, prompt: str, options: dict = None) -> str:
+    """Content address for a generation: sha256 over model, prompt and options."""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "options": options or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier response cache: an in-memory LRU in front of an optional SQLite table.
+
+    Both tiers honour the same TTL. The memory tier is bounded by entry count
+    (least recently used goes first); the disk tier is trimmed back to its
+    bound by last access time.
+    """
+
+    def __init__(
+        self,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        db_path: str = LLM_CACHE_DB,
+        disk_max_entries: int = LLM_CACHE_DISK_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_trim = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        self._db = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"LLM disk cache disabled: {str(e)}")
+                self._db = None
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+                self.counters["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM llm_cache WHERE key=?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._db.execute("UPDATE llm_cache SET accessed_at=? WHERE key=?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.counters["disk_hits"] += 1
+                    return row[0]
+                if row:
+                    self._db.execute("DELETE FROM llm_cache WHERE key=?", (key,))
+                    self._db.commit()
+                    self.counters["expired"] += 1
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, response, expires_at, now),
+                )
+                self._db.commit()
+                self._puts_since_trim += 1
+                if self._puts_since_trim >= 100:
+                    self._trim_disk(now)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self._db is not None,
+            }
+
+    def _remember(self, key: str, response: str, expires_at: float):
+        # Caller holds the lock
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _trim_disk(self, now: float):
+        # Caller holds the lock
+        self._puts_since_trim = 0
+        self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        cursor = self._db.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.disk_max_entries,))
+        self.counters["evictions"] += max(cursor.rowcount, 0)
+        self._db.commit()
@@ -0,0 +1,368 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_cache import LLMResponseCache, make_cache_key
+from ollama_stream import OllamaStreamDecoder, OllamaStreamError, iter_tokens
+from scheduler import LLMScheduler, Rejected, current_request, max_in_flight_for
+from llm_router import LLMRouter
+
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+
+# Tunables (env overridable so ops can size them per box). LLM_MAX_CONCURRENCY
+# bounds connections and waiting threads; the scheduler bounds generations.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "300"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the LLM backend cannot produce a response."""
+
+
+class _RetryableLLMError(LLMError):
+    pass
+
+
+class LLMOverloaded(LLMError):
+    """The scheduler shed the request; status_code is 429 or 503."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMStats:
+    """Running totals of server-reported generation timings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.truncated = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.prompt_eval_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def record(self, decoder: OllamaStreamDecoder):
+        stats = decoder.stats
+        with self._lock:
+            self.requests += 1
+            if not decoder.done:
+                self.truncated += 1
+            self.prompt_tokens += stats.get("prompt_eval_count", 0)
+            self.eval_tokens += stats.get("eval_count", 0)
+            self.prompt_eval_seconds += stats.get("prompt_eval_duration", 0) / 1e9
+            self.eval_seconds += stats.get("eval_duration", 0) / 1e9
+            self.total_seconds += stats.get("total_duration", 0) / 1e9
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "truncated": self.truncated,
+                "prompt_tokens": self.prompt_tokens,
+                "eval_tokens": self.eval_tokens,
+                "eval_tokens_per_sec": round(self.eval_tokens / self.eval_seconds, 2) if self.eval_seconds else 0.0,
+                "prompt_tokens_per_sec": round(self.prompt_tokens / self.prompt_eval_seconds, 2) if self.prompt_eval_seconds else 0.0,
+                "avg_request_seconds": round(self.total_seconds / self.requests, 3) if self.requests else 0.0,
+            }
+
+
+class LLMClient:
+    """Pooled, keep-alive client for the Ollama generate API.
+
+    A single requests.Session is shared by every call so connections are
+    reused, the scheduler decides which call runs next and how many run at
+    once, the router picks the backend for each attempt, and the async
+    entry point runs on a dedicated thread pool so async endpoints never
+    block the event loop.
+
+    Each call's priority and user come from its arguments or, when those
+    are omitted, from the enclosing scheduler.llm_request() context. A call
+    without an explicit model uses the router's model for its task type.
+    """
+
+    def __init__(
+        self,
+        router: LLMRouter = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_backoff: float = LLM_RETRY_BACKOFF,
+        cache: LLMResponseCache = None,
+        embed_model: str = OLLAMA_EMBED_MODEL,
+        scheduler: LLMScheduler = None,
+    ):
+        self.router = router or LLMRouter()
+        self.embed_model = embed_model
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.cache = cache
+        self.stats = LLMStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(4, len(self.router.backends)), pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Capacity grows with the backend pool: each backend runs its own OLLAMA_NUM_PARALLEL
+        self.scheduler = scheduler or LLMScheduler(max_in_flight_for(len(self.router.backends)))
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+
+    # ------------------- SYNC API -------------------
+    def generate(
+        self,
+        prompt: str,
+        model: str = None,
+        options: dict = None,
+        timeout: float = None,
+        use_cache: bool = True,
+        priority: str = None,
+        user=None,
+        task: str = None,
+    ) -> str:
+        """Run one generation, blocking the calling thread until it completes."""
+        payload = {"model": model or self.router.model_for(task), "prompt": prompt}
+        if options:
+            payload["options"] = options
+
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = make_cache_key(payload["model"], prompt, options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        with self._slot(priority, user) as deadline:
+            output = self._with_retry(
+                payload["model"], lambda backend: self._collect(backend, payload, self._remaining(timeout, deadline))
+            )
+
+        if cache_key is not None and output.strip():
+            self.cache.put(cache_key, output)
+        return output
+
+    def stream(
+        self,
+        prompt: str,
+        model: str = None,
+        options: dict = None,
+        timeout: float = None,
+        use_cache: bool = True,
+        priority: str = None,
+        user=None,
+        task: str = None,
+    ):
+        """Yield tokens as the backend emits them.
+
+        Only opening the request is retried; once tokens have been handed to
+        the caller a failure is raised as LLMError. A cached response is
+        yielded as a single chunk.
+        """
+        payload = {"model": model or self.router.model_for(task), "prompt": prompt}
+        if options:
+            payload["options"] = options
+
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = make_cache_key(payload["model"], prompt, options)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        decoder = OllamaStreamDecoder()
+        with self._slot(priority, user) as deadline:
+            # The backend stays leased (and counted as outstanding) until the stream ends
+            response, backend = self._with_retry(
+                payload["model"], lambda backend: self._open(backend, payload, self._remaining(timeout, deadline)), hold=True
+            )
+            ok = False
+            try:
+                yield from self._iter_response(response, decoder)
+                ok = True
+            finally:
+                self.router.release(backend, ok)
+
+        output = decoder.text()
+        if cache_key is not None and decoder.done and output.strip():
+            self.cache.put(cache_key, output)
+
+    def embed(self, texts: list, model: str = None, timeout: float = None, priority: str = None, user=None) -> list:
+        """Embedding vectors for texts, in order, from one batched request."""
+        if not texts:
+            return []
+        payload = {"model": model or self.embed_model, "input": list(texts)}
+        with self._slot(priority, user) as deadline:
+            body = self._with_retry(
+                payload["model"],
+                lambda backend: self._post_json(backend.embed_url, payload, self._remaining(timeout, deadline)),
+            )
+        vectors = body.get("embeddings")
+        if not isinstance(vectors, list) or len(vectors) != len(texts):
+            self.stats.record_error()
+            raise LLMError("Embedding backend returned an unexpected response")
+        return vectors
+
+    # ------------------- ASYNC API -------------------
+    async def agenerate(
+        self,
+        prompt: str,
+        model: str = None,
+        options: dict = None,
+        timeout: float = None,
+        use_cache: bool = True,
+        priority: str = None,
+        user=None,
+        task: str = None,
+    ) -> str:
+        """Async variant of generate(); safe to await from FastAPI handlers."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(
+            self.generate, prompt, model=model, options=options, timeout=timeout, use_cache=use_cache,
+            priority=priority, user=user, task=task,
+        )
+        # The executor thread inherits the caller's llm_request() context
+        return await loop.run_in_executor(self._executor, contextvars.copy_context().run, call)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    # ------------------- INTERNALS -------------------
+    @contextlib.contextmanager
+    def _slot(self, priority: str = None, user=None):
+        """Hold a scheduler slot; yields the request's deadline (time.monotonic() based)."""
+        context_priority, context_user = current_request()
+        priority = priority or context_priority
+        user = user if user is not None else context_user
+        deadline = self.scheduler.deadline_for(priority)
+        try:
+            self.scheduler.acquire(priority, user, deadline)
+        except Rejected as e:
+            raise LLMOverloaded(str(e), e.status_code, e.retry_after) from e
+        try:
+            yield deadline
+        finally:
+            self.scheduler.release(priority)
+
+    def _remaining(self, timeout: float, deadline: float) -> float:
+        """Read timeout for the next attempt, cut short by the request deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError("LLM request deadline exceeded")
+        timeout = timeout if timeout is not None else self.read_timeout
+        return min(timeout, remaining)
+
+    def _with_retry(self, model: str, call, hold: bool = False):
+        """call(backend) with retries; each attempt is routed afresh, so a retry can land elsewhere.
+
+        With hold=True returns (result, backend) and the caller must release the backend.
+        """
+        attempt = 0
+        while True:
+            backend = self.router.acquire(model)
+            try:
+                result = call(backend)
+            except (requests.ConnectionError, requests.Timeout, _RetryableLLMError) as e:
+                self.router.release(backend, ok=False)
+                if attempt >= self.max_retries:
+                    self.stats.record_error()
+                    raise LLMError(f"LLM request failed after {attempt + 1} attempts: {e}") from e
+                self.stats.record_retry()
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"LLM request failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Request errors (4xx, bad JSON) say nothing about the backend's health
+                self.router.release(backend)
+                raise
+            if hold:
+                return result, backend
+            self.router.release(backend)
+            return result
+
+    def _open(self, backend, payload: dict, timeout: float = None):
+        """POST the generation request and return the (unread) streaming response."""
+        read_timeout = timeout if timeout is not None else self.read_timeout
+        response = self.session.post(
+            backend.generate_url,
+            json=payload,
+            stream=True,
+            timeout=(self.connect_timeout, read_timeout),
+        )
+        if response.status_code in RETRYABLE_STATUS:
+            response.close()
+            raise _RetryableLLMError(f"LLM backend returned HTTP {response.status_code}")
+        if response.status_code >= 400:
+            detail = response.text[:200]
+            response.close()
+            self.stats.record_error()
+            raise LLMError(f"LLM backend returned HTTP {response.status_code}: {detail}")
+        return response
+
+    def _post_json(self, url: str, payload: dict, timeout: float = None) -> dict:
+        read_timeout = timeout if timeout is not None else self.read_timeout
+        response = self.session.post(url, json=payload, timeout=(self.connect_timeout, read_timeout))
+        with response:
+            if response.status_code in RETRYABLE_STATUS:
+                raise _RetryableLLMError(f"LLM backend returned HTTP {response.status_code}")
+            if response.status_code >= 400:
+                self.stats.record_error()
+                raise LLMError(f"LLM backend returned HTTP {response.status_code}: {response.text[:200]}")
+            try:
+                return response.json()
+            except ValueError as e:
+                self.stats.record_error()
+                raise LLMError(f"LLM backend returned invalid JSON: {e}") from e
+
+    def _iter_response(self, response, decoder: OllamaStreamDecoder):
+        with response:
+            try:
+                yield from iter_tokens(response.iter_lines(), decoder)
+            except OllamaStreamError as e:
+                self.stats.record_error()
+                raise LLMError(f"LLM stream error: {e}") from e
+        self.stats.record(decoder)
+
+    def _collect(self, backend, payload: dict, timeout: float = None) -> str:
+        decoder = OllamaStreamDecoder()
+        for _ in self._iter_response(self._open(backend, payload, timeout), decoder):
+            pass
+        return decoder.text()
+
+
+llm_client = LLMClient(cache=LLMResponseCache())
@@ -0,0 +1,184 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+import requests
+
+OLLAMA_API = os.getenv("OLLAMA_API", "http://localhost:11434/api/generate")
+# Comma-separated Ollama base URLs; defaults to the single OLLAMA_API host
+OLLAMA_BACKENDS = os.getenv("OLLAMA_BACKENDS", OLLAMA_API.rsplit("/api/", 1)[0])
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+# Model per task type, e.g. {"extraction": "llama3.2:1b", "summary": "llama3"}; unlisted tasks use OLLAMA_MODEL
+LLM_TASK_MODELS = json.loads(os.getenv("LLM_TASK_MODELS", "{}"))
+LLM_HEALTH_INTERVAL = float(os.getenv("LLM_HEALTH_INTERVAL", "10"))
+LLM_HEALTH_TIMEOUT = float(os.getenv("LLM_HEALTH_TIMEOUT", "2"))
+# Consecutive failed requests that eject a backend, and for how long
+LLM_EJECT_AFTER = int(os.getenv("LLM_EJECT_AFTER", "3"))
+LLM_EJECT_SECONDS = float(os.getenv("LLM_EJECT_SECONDS", "30"))
+
+
+def _model_key(model: str) -> str:
+    # Ollama reports "llama3:latest" for a model requested as "llama3"
+    return model if ":" in model else f"{model}:latest"
+
+
+class Backend:
+    """One Ollama instance and what the router knows about it."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.generate_url = f"{self.base_url}/api/generate"
+        self.embed_url = f"{self.base_url}/api/embed"
+        self.tags_url = f"{self.base_url}/api/tags"
+        self.outstanding = 0
+        self.models = None  # unknown until the first health check
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or _model_key(model) in self.models
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "url": self.base_url,
+            "healthy": self.healthy,
+            "ejected": self.ejected_until > now,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "models": sorted(self.models) if self.models is not None else None,
+        }
+
+
+class LLMRouter:
+    """Spreads LLM requests over several Ollama backends.
+
+    Each request goes to the available backend serving its model with the
+    fewest requests outstanding, ties broken round-robin. A backend is
+    ejected after LLM_EJECT_AFTER consecutive failures or a failed health
+    check, and re-admitted by the first health check that succeeds once its
+    ejection has run out. Health checks also learn which models each
+    backend has, which is how task types routed to a smaller model find a
+    backend that serves it. When every backend is ejected, requests still
+    go to the least loaded one rather than failing outright.
+    """
+
+    def __init__(
+        self,
+        backends=OLLAMA_BACKENDS,
+        default_model: str = OLLAMA_MODEL,
+        task_models: dict = None,
+        health_interval: float = LLM_HEALTH_INTERVAL,
+        eject_after: int = LLM_EJECT_AFTER,
+        eject_seconds: float = LLM_EJECT_SECONDS,
+    ):
+        if isinstance(backends, str):
+            backends = [b.strip() for b in backends.split(",") if b.strip()]
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        # Full endpoint URLs are accepted too
+        self.backends = [Backend(url.rsplit("/api/", 1)[0]) for url in backends]
+        self.default_model = default_model
+        self.task_models = dict(LLM_TASK_MODELS if task_models is None else task_models)
+        self.health_interval = health_interval
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def model_for(self, task: str = None) -> str:
+        return self.task_models.get(task, self.default_model) if task else self.default_model
+
+    def acquire(self, model: str) -> Backend:
+        """Backend for one request to model; pass it to release() when the request ends."""
+        now = time.time()
+        with self._lock:
+            available = [b for b in self.backends if b.healthy and b.ejected_until <= now]
+            candidates = [b for b in available if b.serves(model)] or available or self.backends
+            offset = next(self._turn)
+            order = candidates[offset % len(candidates):] + candidates[:offset % len(candidates)]
+            backend = min(order, key=lambda b: b.outstanding)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend: Backend, ok: bool = True):
+        """ok=False marks a backend-side failure (connection error, timeout, 5xx)."""
+        with self._lock:
+            backend.outstanding -= 1
+            if ok:
+                backend.consecutive_failures = 0
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.consecutive_failures >= self.eject_after:
+                self._eject(backend, f"{backend.consecutive_failures} consecutive failures")
+
+    def _eject(self, backend: Backend, reason: str):
+        # Caller holds the lock
+        if backend.ejected_until <= time.time():
+            backend.ejections += 1
+            print(f"Ejecting LLM backend {backend.base_url}: {reason}")
+        backend.ejected_until = time.time() + self.eject_seconds
+        backend.consecutive_failures = 0
+
+    # ------------------- HEALTH CHECKS -------------------
+    def check(self, backend: Backend, session=None):
+        """Probe one backend's model list and update its health."""
+        try:
+            response = (session or requests).get(backend.tags_url, timeout=LLM_HEALTH_TIMEOUT)
+            response.raise_for_status()
+            models = {m.get("name") or m.get("model") for m in response.json().get("models", [])}
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            with self._lock:
+                backend.healthy = False
+                self._eject(backend, f"health check failed: {e}")
+            return
+        with self._lock:
+            backend.models = {m for m in models if m}
+            if backend.ejected_until > time.time():
+                # Still serving its ejection; a later check re-admits it
+                return
+            if not backend.healthy:
+                print(f"Re-admitting LLM backend {backend.base_url}")
+            backend.healthy = True
+
+    def check_all(self, session=None):
+        for backend in self.backends:
+            self.check(backend, session)
+
+    def start_health_checks(self, session=None):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                self.check_all(session)
+                self._stop.wait(self.health_interval)
+
+        self._thread = threading.Thread(target=loop, name="llm-health", daemon=True)
+        self._thread.start()
+
+    def stop_health_checks(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=LLM_HEALTH_TIMEOUT + 1)
+            self._thread = None
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                "backends": [b.to_dict(now) for b in self.backends],
+                "task_models": dict(self.task_models),
+            }
@@ -1,14 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, Depends
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from charset_normalizer import from_path
-import shutil, os
+from fastapi.concurrency import run_in_threadpool
+import os, json, time, zipfile, asyncio, functools
+from typing import List
 import pandas as pd
-from utils import call_llama3, classify_department, extract_entities, classify_ticket, generate_it_suggestion
-from workflow_engine import generate_workflow
+from utils import call_llama3, acall_llama3, stream_llama3, classify_department, extract_entities, classify_ticket, generate_it_suggestion, build_it_suggestion_prompt
+from extractors import extract_finance_fields, extract_legal_fields
+from workflow_engine import generate_workflow, workflow_engine
+from prompts import (chars_for, document_summary_prompt, ticket_summary_prompt, docs_query_prompt,
+                     ticket_query_prompt, resume_skills_prompt, job_matching_prompt, prompt_stats)
+from suggestion_cache import suggestion_cache
+from incidents import incident_index
+from fast_path import run_tiered, try_rules, invoice_summary, tier_stats
+from llm_client import llm_client, LLMError, LLMOverloaded
+from scheduler import llm_request
+from task_graph import TaskGraph
+from jobs import JobQueue
+from text_extraction import extract_text_pooled, shutdown_process_pool
+from content_store import content_store, save_stream
+from results_repo import results_repo
+from search_index import search_index
+from retrieval import vector_index, format_context, RAG_TOP_K, RAG_FALLBACK_ITEMS
 from pydantic import BaseModel
 import bcrypt
 import mysql.connector
+from db import db_pool, db_connection, get_db, DatabaseUnavailable
+from migrations import run_migrations, table_columns
+from pagination import keyset_page, parse_fields
+from candidates import index_candidate, parse_job_matches, parse_skills_analysis, profile_columns, search as search_candidate_index
 from datetime import datetime
 
 app = FastAPI()
@@ -20,13 +40,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="roylobo8",
-        database="genai_portal"
-    )
+@app.on_event("startup")
+def apply_migrations():
+    try:
+        with db_connection() as db:
+            applied = run_migrations(db)
+        print(f"Schema up to date (applied: {applied or 'none'})")
+    except Exception as e:
+        # Keep serving the document endpoints even when MySQL is down
+        print(f"Skipping migrations, database unavailable: {str(e)}")
+
+@app.on_event("shutdown")
+def close_shared_resources():
+    llm_client.close()
+    shutdown_process_pool()
+    db_pool.close()
+
+@app.exception_handler(LLMOverloaded)
+def llm_overloaded(request, exc: LLMOverloaded):
+    return JSONResponse(status_code=exc.status_code, content={"success": False, "message": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(DatabaseUnavailable)
+def database_unavailable(request, exc: DatabaseUnavailable):
+    return JSONResponse(status_code=503, content={"success": False, "message": f"Database connection error: {str(exc)}"})
 
 class User(BaseModel):
     username: str
@@ -35,8 +72,7 @@ class User(BaseModel):
 
 # ---------------- REGISTER & LOGIN ----------------
 @app.post("/register")
-def register(user: User):
-    db = get_db()
+def register(user: User, db=Depends(get_db)):
     cursor = db.cursor()
     username = user.username.strip().lower()
     cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
@@ -60,8 +96,7 @@ def register(user: User):
         return {"success": False, "message": f"Unexpected error: {str(e)}"}
 
 @app.post("/login")
-def login(user: User):
-    db = get_db()
+def login(user: User, db=Depends(get_db)):
     cursor = db.cursor(dictionary=True)
     cursor.execute("SELECT * FROM users WHERE username=%s", (user.username,))
     record = cursor.fetchone()
@@ -70,83 +105,296 @@ def login(user: User):
     return {"success": False, "message": "Invalid credentials"}
 
 # ---------------- IT TICKET SYSTEM ----------------
-@app.post("/create_ticket/")
-def create_ticket(user_id: int = Form(...), description: str = Form(...), affected_user: str = Form(None), ticket_type: str = Form("self")):
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    
+# Ticket helpers check a pooled connection out only for their own statements,
+# so no connection is held while the LLM calls run
+def _ticket_context(user_id: int, ticket_type: str, affected_user: str) -> str:
     # Get user info for context
-    cursor.execute("SELECT username, department FROM users WHERE id=%s", (user_id,))
-    user_info = cursor.fetchone()
+    with db_connection() as db:
+        cursor = db.cursor(dictionary=True)
+        cursor.execute("SELECT username, department FROM users WHERE id=%s", (user_id,))
+        user_info = cursor.fetchone()
     
     # Determine ticket context
     if ticket_type == "self":
-        ticket_context = f"Self-reported by {user_info['username']}"
+        return f"Self-reported by {user_info['username']}"
     elif ticket_type == "other" and affected_user:
-        ticket_context = f"Reported by {user_info['username']} for {affected_user}"
+        return f"Reported by {user_info['username']} for {affected_user}"
     elif ticket_type == "system":
-        ticket_context = f"System-generated ticket for {affected_user or 'unknown user'}"
+        return f"System-generated ticket for {affected_user or 'unknown user'}"
     else:
-        ticket_context = f"Reported by {user_info['username']}"
-    
+        return f"Reported by {user_info['username']}"
+
+def _full_description(ticket_context: str, description: str) -> str:
     # Add context to description
-    full_description = f"{ticket_context}\n\nIssue: {description}"
-    
+    return f"{ticket_context}\n\nIssue: {description}"
+
+def _insert_ticket(user_id, category, full_description, ai_summary, ai_suggestion, affected_user, ticket_type):
+    values = {
+        "user_id": user_id,
+        "category": category,
+        "description": full_description,
+        "ai_summary": ai_summary,
+        "ai_suggestion": ai_suggestion,
+        "status": "Open",
+        "affected_user": affected_user,
+        "ticket_type": ticket_type,
+    }
+    with db_connection() as db:
+        # Older databases may lack the newer columns; the cached column list
+        # keeps this to a single INSERT
+        columns = [c for c in values if c in table_columns(db, "tickets")]
+        cursor = db.cursor()
+        cursor.execute(
+            f"INSERT INTO tickets ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+            [values[c] for c in columns],
+        )
+        db.commit()
+        ticket_id = cursor.lastrowid
+    search_index.index("ticket", ticket_id, title=category, summary=ai_summary, entities=ai_suggestion,
+                       body=full_description, owner_id=user_id)
+    # Embedding for /query_ticket/ retrieval happens off the request path
+    job_queue.submit("index_ticket", {
+        "ticket_id": ticket_id,
+        "user_id": user_id,
+        "text": f"Category: {category}\nSummary: {ai_summary}\n{full_description}",
+    })
+    return ticket_id
+
+def _cached_suggestion(category: str, description: str):
+    """Stored suggestion for a near-duplicate ticket; a stale one is regenerated in the background."""
+    cached = suggestion_cache.lookup(category, description)
+    if cached is None:
+        return None
+    suggestion, entry_id, stale = cached
+    if stale:
+        claim = suggestion_cache.claim_refresh(entry_id)
+        if claim:
+            job_queue.submit("refresh_suggestion", {"entry_id": entry_id, "category": claim[0], "description": claim[1]})
+    return suggestion
+
+def _it_suggestion(category: str, description: str) -> str:
+    suggestion = _cached_suggestion(category, description)
+    if suggestion is None:
+        suggestion = generate_it_suggestion(category, description)
+        suggestion_cache.store(category, description, suggestion)
+    return suggestion
+
+def _sse(event: str, data) -> str:
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _shared_suggestion(incident, opened: bool):
+    """Suggestion of the incident a duplicate ticket joined, once its first ticket has it."""
+    if incident is None or opened:
+        return None
+    return incident.wait()
+
+@app.post("/create_ticket/")
+def create_ticket(user_id: int = Form(...), description: str = Form(...), affected_user: str = Form(None), ticket_type: str = Form("self")):
+    # Summary needs the user context, suggestion needs the category; the two LLM calls overlap.
+    # A duplicate of a recent ticket reuses its incident's suggestion instead. Only the
+    # suggestion is shared: each summary is written from its own ticket's user context.
     category = classify_ticket(description)
-    ai_summary = call_llama3(f"Summarize this IT ticket: {full_description[:2000]}")
-    ai_suggestion = generate_it_suggestion(category, description)
-    
+    incident, opened = incident_index.assign(category, description)
+    # Duplicates wait here rather than in a TaskGraph worker, which the opener may need
+    shared = _shared_suggestion(incident, opened)
+
+    def suggest():
+        if shared is not None:
+            return shared
+        suggestion = _it_suggestion(category, description)
+        if opened:
+            incident.resolve(suggestion)
+        return suggestion
+
+    graph = TaskGraph("create_ticket")
+    graph.add("context", _ticket_context, args=(user_id, ticket_type, affected_user))
+    graph.add("summary", lambda ticket_context: call_llama3(
+        ticket_summary_prompt(_full_description(ticket_context, description)), task="summary"), "context")
+    graph.add("suggestion", suggest)
+    graph.add(
+        "insert",
+        lambda ticket_context, ai_summary, ai_suggestion: _insert_ticket(
+            user_id, category, _full_description(ticket_context, description), ai_summary, ai_suggestion, affected_user, ticket_type
+        ),
+        "context", "summary", "suggestion",
+    )
     try:
-        cursor.execute("""
-            INSERT INTO tickets (user_id, category, description, ai_summary, ai_suggestion, status, affected_user, ticket_type)
-            VALUES (%s, %s, %s, %s, %s, 'Open', %s, %s)
-        """, (user_id, category, full_description, ai_summary, ai_suggestion, affected_user, ticket_type))
-    except Exception as e:
-        # If new columns don't exist, try without them
-        print(f"Error with new columns, trying without: {str(e)}")
-        try:
-            cursor.execute("""
-                INSERT INTO tickets (user_id, category, description, ai_summary, ai_suggestion, status)
-                VALUES (%s, %s, %s, %s, %s, 'Open')
-            """, (user_id, category, full_description, ai_summary, ai_suggestion))
-        except Exception as e2:
-            # If status column doesn't exist, try without it
-            print(f"Error with status column, trying without: {str(e2)}")
-            cursor.execute("""
-                INSERT INTO tickets (user_id, category, description, ai_summary, ai_suggestion)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (user_id, category, full_description, ai_summary, ai_suggestion))
+        with llm_request("interactive", user_id):
+            results = graph.run()
+    finally:
+        # An incident whose first ticket failed must not keep duplicates waiting
+        if opened and not incident.resolved:
+            incident_index.abandon(incident)
     
-    db.commit()
+    ticket_context = results["context"]
+    ai_summary = results["summary"]
+    ai_suggestion = results["suggestion"]
+    if incident is not None:
+        incident_index.attach(incident, results["insert"])
     
     return {
         "success": True,
         "category": category,
         "summary": ai_summary,
         "suggestion": ai_suggestion,
-        "context": ticket_context
+        "context": ticket_context,
+        "incident_id": incident.id if incident else None,
     }
 
+def _ticket_stream_events(user_id: int, description: str, affected_user: str, ticket_type: str):
+    ticket_context = _ticket_context(user_id, ticket_type, affected_user)
+    full_description = _full_description(ticket_context, description)
+    
+    category = classify_ticket(description)
+    incident, opened = incident_index.assign(category, description)
+    try:
+        yield _sse("category", {"category": category, "context": ticket_context,
+                                "incident_id": incident.id if incident else None})
+        
+        parts = []
+        for token in stream_llama3(ticket_summary_prompt(full_description), priority="interactive", user=user_id,
+                                   task="summary"):
+            parts.append(token)
+            yield _sse("summary_token", {"text": token})
+        ai_summary = "".join(parts).strip()
+        yield _sse("summary", {"summary": ai_summary})
+        
+        ai_suggestion = _shared_suggestion(incident, opened) or _cached_suggestion(category, description)
+        if ai_suggestion is None:
+            parts = []
+            for token in stream_llama3(build_it_suggestion_prompt(category, description),
+                                       priority="interactive", user=user_id):
+                parts.append(token)
+                yield _sse("suggestion_token", {"text": token})
+            ai_suggestion = "".join(parts).strip()
+            suggestion_cache.store(category, description, ai_suggestion)
+        else:
+            yield _sse("suggestion_token", {"text": ai_suggestion})
+        yield _sse("suggestion", {"suggestion": ai_suggestion})
+        if opened:
+            incident.resolve(ai_suggestion)
+    except LLMError as e:
+        yield _sse("error", {"message": str(e)})
+        return
+    finally:
+        # Also covers a client that disconnects mid-stream, even right after the category event
+        if opened and not incident.resolved:
+            incident_index.abandon(incident)
+    
+    ticket_id = _insert_ticket(user_id, category, full_description, ai_summary, ai_suggestion, affected_user, ticket_type)
+    if incident is not None:
+        incident_index.attach(incident, ticket_id)
+    yield _sse("done", {
+        "success": True,
+        "category": category,
+        "summary": ai_summary,
+        "suggestion": ai_suggestion,
+        "context": ticket_context,
+        "incident_id": incident.id if incident else None,
+    })
+
+@app.post("/create_ticket/stream/")
+def create_ticket_stream(user_id: int = Form(...), description: str = Form(...), affected_user: str = Form(None), ticket_type: str = Form("self")):
+    """SSE variant of /create_ticket/: streams summary and suggestion tokens as they are generated"""
+    events = _ticket_stream_events(user_id, description, affected_user, ticket_type)
+    return StreamingResponse(events, media_type="text/event-stream")
+
+@app.get("/incidents/")
+def list_incidents(category: str = None, min_tickets: int = 2):
+    """Active clusters of near-duplicate tickets, largest first."""
+    incidents = incident_index.active(category, min_tickets)
+    return {"incidents": incidents, "count": len(incidents), "tickets": sum(i["tickets"] for i in incidents)}
+
+@app.get("/incidents/{incident_id}")
+def get_incident(incident_id: int):
+    incident = incident_index.get(incident_id)
+    if incident is None:
+        return JSONResponse(status_code=404, content={"error": "Incident not found"})
+    return incident
+
 @app.get("/tickets/")
-def get_tickets(user_id: int):
-    db = get_db()
+def get_tickets(user_id: int, db=Depends(get_db)):
     cursor = db.cursor(dictionary=True)
     cursor.execute("SELECT * FROM tickets WHERE user_id=%s ORDER BY created_at DESC", (user_id,))
     return cursor.fetchall()
 
+TICKET_FIELDS = ("id", "user_id", "category", "description", "ai_summary", "ai_suggestion", "status",
+                 "affected_user", "ticket_type", "escalation_reason", "created_at")
+TICKET_SUMMARY_FIELDS = ("id", "category", "status", "ticket_type", "affected_user", "created_at")
+
+@app.get("/tickets/page/")
+def get_tickets_page(user_id: int, limit: int = 25, cursor: str = None, status: str = None, category: str = None,
+                     fields: str = None, db=Depends(get_db)):
+    """Keyset-paginated ticket list; summary columns only unless fields= asks for more"""
+    try:
+        columns = parse_fields(fields, TICKET_FIELDS, TICKET_SUMMARY_FIELDS)
+        return keyset_page(db, "tickets", user_id, columns, {"status": status, "category": category}, limit, cursor)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+def _retrieve_context(namespace: str, question: str, owner_id: int = None):
+    """Top-k chunks for question as (context, sources); (None, []) if nothing is indexed or embedding fails."""
+    try:
+        hits = vector_index.search(namespace, question, RAG_TOP_K, owner_id)
+    except LLMError as e:
+        print(f"Retrieval unavailable, falling back to recent items: {e}")
+        return None, []
+    if not hits:
+        return None, []
+    return format_context(hits), sorted({hit["source"] for hit in hits})
+
+def _keyword_context(kind: str, question: str, user_id: int = None):
+    """BM25 candidates for question as (context, sources); (None, []) when nothing matches."""
+    hits = search_index.search(question, kinds=(kind,), user_id=user_id, limit=RAG_TOP_K)
+    if not hits:
+        return None, []
+    return "\n---\n".join(f"{hit['summary']}\n{hit['snippet']}" for hit in hits), [hit["ref"] for hit in hits]
+
+def _recent_ticket_summaries(user_id: int) -> str:
+    # Release the connection before the (slow) LLM call
+    with db_connection() as db:
+        cursor = db.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT ai_summary FROM tickets WHERE user_id=%s ORDER BY created_at DESC, id DESC LIMIT %s",
+            (user_id, RAG_FALLBACK_ITEMS),
+        )
+        return " ".join([t["ai_summary"] or "" for t in cursor.fetchall()])
+
 @app.post("/query_ticket/")
 def query_ticket(user_id: int = Form(...), question: str = Form(...)):
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT ai_summary FROM tickets WHERE user_id=%s", (user_id,))
-    summaries = " ".join([t["ai_summary"] for t in cursor.fetchall()])
-    prompt = f"User submitted IT tickets summaries:\n{summaries}\nQuestion: {question}"
-    answer = call_llama3(prompt)
-    return {"answer": answer}
+    with llm_request("interactive", user_id):
+        summaries, sources = _retrieve_context("tickets", question, owner_id=user_id)
+        if summaries is None:
+            summaries, sources = _keyword_context("ticket", question, user_id)
+        if summaries is None:
+            summaries = _recent_ticket_summaries(user_id)
+        answer = call_llama3(ticket_query_prompt(summaries, question))
+    return {"answer": answer, "sources": sources}
+
+@app.get("/stats/")
+def get_stats():
+    """Runtime counters for capacity planning"""
+    return {
+        "llm": llm_client.stats.snapshot(),
+        "llm_scheduler": llm_client.scheduler.stats(),
+        "llm_backends": llm_client.router.stats(),
+        "llm_cache": llm_client.cache.stats() if llm_client.cache else None,
+        "jobs": job_queue.stats(),
+        "content_store": content_store.stats(),
+        "db_pool": db_pool.stats(),
+        "results": {**results_repo.stats(), "live": results_repo.count()},
+        "vector_index": vector_index.stats(),
+        "search_index": search_index.stats(),
+        "workflow": workflow_engine.stats(),
+        "fast_path": tier_stats.snapshot(),
+        "prompts": prompt_stats.snapshot(),
+        "suggestions": suggestion_cache.stats(),
+        "incidents": incident_index.stats(),
+    }
 
 @app.get("/download_csv/")
-def download_csv(user_id: int):
-    db = get_db()
+def download_csv(user_id: int, db=Depends(get_db)):
     cursor = db.cursor(dictionary=True)
     cursor.execute("SELECT * FROM tickets WHERE user_id=%s", (user_id,))
     tickets = cursor.fetchall()
@@ -158,28 +406,11 @@ def download_csv(user_id: int):
     return FileResponse(path, filename=path)
 
 @app.post("/resolve_ticket/")
-def resolve_ticket(ticket_id: int = Form(...), user_id: int = Form(...)):
+def resolve_ticket(ticket_id: int = Form(...), user_id: int = Form(...), db=Depends(get_db)):
     try:
         print(f"Attempting to resolve ticket {ticket_id} for user {user_id}")
         
-        # Test database connection first
-        try:
-            db = get_db()
-            cursor = db.cursor(dictionary=True)
-            print("Database connection successful")
-        except Exception as conn_error:
-            print(f"Database connection failed: {str(conn_error)}")
-            return {"success": False, "message": f"Database connection error: {str(conn_error)}"}
-        
-        # Try to add status column if it doesn't exist (ignore if already exists)
-        try:
-            cursor.execute("ALTER TABLE tickets ADD COLUMN status VARCHAR(20) DEFAULT 'Open'")
-            db.commit()
-            print("Status column added successfully")
-        except Exception as alter_error:
-            # If column already exists, this will fail - that's okay
-            print(f"Status column already exists or other alter error: {str(alter_error)}")
-            db.rollback()  # Rollback the failed alter
+        cursor = db.cursor(dictionary=True)
         
         # Verify the ticket belongs to the user and check if they can resolve it
         try:
@@ -227,28 +458,11 @@ def resolve_ticket(ticket_id: int = Form(...), user_id: int = Form(...)):
         return {"success": False, "message": f"Database error: {str(e)}"}
 
 @app.post("/reopen_ticket/")
-def reopen_ticket(ticket_id: int = Form(...), user_id: int = Form(...), reason: str = Form(...)):
+def reopen_ticket(ticket_id: int = Form(...), user_id: int = Form(...), reason: str = Form(...), db=Depends(get_db)):
     try:
         print(f"Attempting to reopen ticket {ticket_id} for user {user_id}")
         
-        # Test database connection first
-        try:
-            db = get_db()
-            cursor = db.cursor(dictionary=True)
-            print("Database connection successful")
-        except Exception as conn_error:
-            print(f"Database connection failed: {str(conn_error)}")
-            return {"success": False, "message": f"Database connection error: {str(conn_error)}"}
-        
-        # Try to add status column if it doesn't exist (ignore if already exists)
-        try:
-            cursor.execute("ALTER TABLE tickets ADD COLUMN status VARCHAR(20) DEFAULT 'Open'")
-            db.commit()
-            print("Status column added successfully")
-        except Exception as alter_error:
-            # If column already exists, this will fail - that's okay
-            print(f"Status column already exists or other alter error: {str(alter_error)}")
-            db.rollback()  # Rollback the failed alter
+        cursor = db.cursor(dictionary=True)
         
         # Verify the ticket belongs to the user
         try:
@@ -277,27 +491,11 @@ def reopen_ticket(ticket_id: int = Form(...), user_id: int = Form(...), reason:
         return {"success": False, "message": f"Database error: {str(e)}"}
 
 @app.post("/escalate_ticket/")
-def escalate_ticket(ticket_id: int = Form(...), user_id: int = Form(...), escalation_reason: str = Form(...)):
+def escalate_ticket(ticket_id: int = Form(...), user_id: int = Form(...), escalation_reason: str = Form(...), db=Depends(get_db)):
     try:
         print(f"Attempting to escalate ticket {ticket_id} for user {user_id}")
         
-        # Test database connection first
-        try:
-            db = get_db()
-            cursor = db.cursor(dictionary=True)
-            print("Database connection successful")
-        except Exception as conn_error:
-            print(f"Database connection failed: {str(conn_error)}")
-            return {"success": False, "message": f"Database connection error: {str(conn_error)}"}
-        
-        # Try to add escalation_reason column if it doesn't exist
-        try:
-            cursor.execute("ALTER TABLE tickets ADD COLUMN escalation_reason TEXT")
-            db.commit()
-            print("Escalation reason column added successfully")
-        except Exception as alter_error:
-            print(f"Escalation reason column already exists or other alter error: {str(alter_error)}")
-            db.rollback()
+        cursor = db.cursor(dictionary=True)
         
         # Verify the ticket belongs to the user
         try:
@@ -326,10 +524,9 @@ def escalate_ticket(ticket_id: int = Form(...), user_id: int = Form(...), escala
         return {"success": False, "message": f"Database error: {str(e)}"}
 
 @app.get("/debug/tickets/")
-def debug_tickets():
+def debug_tickets(db=Depends(get_db)):
     """Debug endpoint to check ticket table structure"""
     try:
-        db = get_db()
         cursor = db.cursor(dictionary=True)
         
         # Check if table exists by trying to select from it
@@ -349,200 +546,104 @@ def debug_tickets():
         return {"error": str(e), "table_exists": False}
 
 # ---------------- HR TALENT MANAGEMENT SYSTEM ----------------
+# Extraction stops once the resume prompt budget can be filled
+RESUME_EXTRACT_CHARS = chars_for("resume_skills")
+
+def _analyze_resume(file_path: str, filename: str, user_id: int, sha256: str, retryable: bool = False) -> dict:
+    """Extract, analyze and store one saved resume.
+
+    A resume whose content was analyzed before reuses that analysis and skips
+    extraction and the LLM. With retryable=True, LLM and database failures are
+    raised instead of being turned into an error body, so the job queue can
+    retry them.
+    """
+    cached = content_store.get_analysis(sha256, "resume")
+    
+    # Skills analysis -> job matching must chain
+    graph = TaskGraph("upload_resume")
+    if cached is not None:
+        print(f"Reusing analysis of identical resume content {sha256[:12]}")
+        graph.add("skills_analysis", lambda: cached["skills_analysis"])
+        graph.add("job_matches", lambda: cached["job_matches"])
+    else:
+        # Only the head of the resume reaches the LLM, so stop parsing there
+        text, error = _extract_cached(file_path, filename, sha256, max_chars=RESUME_EXTRACT_CHARS)
+        if error:
+            return error
+        print(f"Extracted text length: {len(text)} characters")
+        
+        graph.add("skills_analysis", lambda: call_llama3(resume_skills_prompt(text)))
+        graph.add("job_matches", lambda skills_analysis: call_llama3(job_matching_prompt(skills_analysis)), "skills_analysis")
+    try:
+        print("Calling LLM for skills analysis and job matching...")
+        # Two long prompts per resume: batch class, so interactive traffic goes first
+        with llm_request("batch", user_id):
+            results = graph.run()
+    except Exception as e:
+        if retryable:
+            raise
+        failed = {"skills_analysis": "Skills analysis", "job_matches": "Job matching"}.get(graph.failed_step, "Resume analysis")
+        print(f"Error in {failed.lower()}: {str(e)}")
+        return {"error": f"{failed} failed: {str(e)}"}
+    
+    skills_analysis = results["skills_analysis"]
+    job_matches = results["job_matches"]
+    print(f"Skills analysis completed: {len(skills_analysis)} characters")
+    print(f"Job matching completed: {len(job_matches)} characters")
+    if cached is None:
+        content_store.put_analysis(sha256, "resume", {"skills_analysis": skills_analysis, "job_matches": job_matches})
+    
+    profile = parse_skills_analysis(skills_analysis)
+    matches = parse_job_matches(job_matches)
+    columns = profile_columns(profile)
+    
+    # Store in database; the resume row and its candidate index share one transaction
+    try:
+        with db_connection() as db:
+            cursor = db.cursor(dictionary=True)
+            cursor.execute("""
+                INSERT INTO resumes (user_id, filename, candidate_name, experience_years, 
+                                   technical_skills, soft_skills, education, previous_roles, 
+                                   skills_analysis, job_matches, status)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Analyzed')
+            """, (user_id, filename, columns["candidate_name"], columns["experience_years"],
+                  columns["technical_skills"], columns["soft_skills"], columns["education"],
+                  columns["previous_roles"], skills_analysis, job_matches))
+            index_candidate(cursor, cursor.lastrowid, user_id, profile, matches)
+            print("Resume inserted successfully")
+            db.commit()
+            print("Database commit successful")
+    except Exception as e:
+        if retryable:
+            raise
+        print(f"Database error: {str(e)}")
+        return {"error": f"Database error: {str(e)}"}
+    
+    return {
+        "success": True,
+        "filename": filename,
+        "skills_analysis": skills_analysis,
+        "job_matches": job_matches
+    }
+
 @app.post("/upload_resume/")
 async def upload_resume(file: UploadFile = File(...), user_id: int = Form(...)):
     """Upload and analyze resume for job matching"""
     try:
         print(f"Starting resume upload for user {user_id}, file: {file.filename}")
         
-        # Ensure upload directory exists
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
+        file_path, sha256 = await run_in_threadpool(_save_upload, file)
         print(f"File saved to: {file_path}")
-    
-        text = ""
-        filename_lower = file.filename.lower().strip()
-        try:
-            if filename_lower.endswith(".txt"):
-                detected = from_path(file_path).best()
-                text = str(detected) if detected else ""
-            elif filename_lower.endswith(".pdf"):
-                import pdfplumber
-                try:
-                    with pdfplumber.open(file_path) as pdf:
-                        if len(pdf.pages) == 0:
-                            return JSONResponse(content={"error": f"PDF {file.filename} has no readable pages"})
-                        text = " ".join([page.extract_text() or "" for page in pdf.pages])
-                        if not text.strip():
-                            return JSONResponse(content={"error": f"PDF {file.filename} contains no extractable text"})
-                except Exception as pdf_error:
-                    return JSONResponse(content={"error": f"PDF processing failed for {file.filename}", "details": str(pdf_error)})
-            elif filename_lower.endswith(".docx"):
-                from docx import Document
-                doc = Document(file_path)
-                text = " ".join([p.text for p in doc.paragraphs])
-        except Exception as e:
-            return JSONResponse(content={"error": f"Failed to read {file.filename}", "details": str(e)})
-        
-        if not text.strip():
-            return JSONResponse(content={"error": "No readable text found", "filename": file.filename})
         
-        print(f"Extracted text length: {len(text)} characters")
-        
-        # Analyze resume and extract skills
-        try:
-            skills_prompt = f"""
-            Analyze this resume and extract:
-            1. Candidate name
-            2. Years of experience
-            3. Technical skills (programming languages, tools, frameworks)
-            4. Soft skills (communication, leadership, etc.)
-            5. Education background
-            6. Previous job roles
-            
-            Resume: {text[:3000]}
-            
-            Return as JSON format:
-            {{
-                "name": "candidate name",
-                "experience_years": number,
-                "technical_skills": ["skill1", "skill2"],
-                "soft_skills": ["skill1", "skill2"],
-                "education": "degree and institution",
-                "previous_roles": ["role1", "role2"]
-            }}
-            """
-            
-            print("Calling LLM for skills analysis...")
-            skills_analysis = call_llama3(skills_prompt)
-            print(f"Skills analysis completed: {len(skills_analysis)} characters")
-        except Exception as e:
-            print(f"Error in skills analysis: {str(e)}")
-            return JSONResponse(content={"error": f"Skills analysis failed: {str(e)}"})
-        
-        # Job matching analysis
-        try:
-            job_matching_prompt = f"""
-            Based on this candidate profile, analyze their fit for different job roles:
-            
-            {skills_analysis}
-            
-            Available job roles:
-            1. Frontend Developer (React, Vue, Angular, JavaScript, HTML, CSS)
-            2. Backend Developer (Python, Java, Node.js, SQL, APIs)
-            3. Full Stack Developer (Frontend + Backend skills)
-            4. Data Analyst (SQL, Python, Excel, Tableau, PowerBI)
-            5. DevOps Engineer (Docker, Kubernetes, AWS, CI/CD)
-            6. UI/UX Designer (Figma, Adobe, User Research, Prototyping)
-            7. Project Manager (Agile, Scrum, Leadership, Communication)
-            8. Business Analyst (Requirements, Documentation, Stakeholder Management)
-            9. QA Engineer (Testing, Automation, Selenium, JUnit)
-            10. Support Engineer (Customer Service, Technical Support, Troubleshooting)
-            11. Sales Executive (Sales, CRM, Communication, Negotiation)
-            12. Marketing Specialist (Digital Marketing, SEO, Social Media, Analytics)
-            13. Finance Analyst (Accounting, Excel, Financial Modeling, Analysis)
-            14. HR Specialist (Recruitment, Employee Relations, HRIS, Compliance)
-            15. Operations Manager (Process Improvement, Team Management, Logistics)
-            
-            Return ONLY a JSON array with this exact format:
-            [
-              {{
-                "role": "Role Name",
-                "match": 85,
-                "fit": "High"
-              }},
-              {{
-                "role": "Role Name", 
-                "match": 72,
-                "fit": "Medium"
-              }}
-            ]
-            
-            Rules:
-            - Return maximum 3 best-fit roles
-            - Match percentage should be 0-100
-            - Fit should be "High" (80+), "Medium" (60-79), or "Low" (below 60)
-            - Only return the JSON array, no other text
-            """
-            
-            print("Calling LLM for job matching...")
-            job_matches = call_llama3(job_matching_prompt)
-            print(f"Job matching completed: {len(job_matches)} characters")
-        except Exception as e:
-            print(f"Error in job matching: {str(e)}")
-            return JSONResponse(content={"error": f"Job matching failed: {str(e)}"})
-        
-        # Store in database
-        try:
-            print("Connecting to database...")
-            db = get_db()
-            cursor = db.cursor(dictionary=True)
-            
-            try:
-                cursor.execute("""
-                    INSERT INTO resumes (user_id, filename, candidate_name, experience_years, 
-                                       technical_skills, soft_skills, education, previous_roles, 
-                                       skills_analysis, job_matches, status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Analyzed')
-                """, (user_id, file.filename, "", 0, "", "", "", "", skills_analysis, job_matches))
-                print("Resume inserted successfully")
-            except Exception as e:
-                # If table doesn't exist, create it
-                print(f"Error inserting resume: {str(e)}")
-                print("Creating resumes table...")
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS resumes (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        user_id INT,
-                        filename VARCHAR(255),
-                        candidate_name VARCHAR(255),
-                        experience_years INT,
-                        technical_skills TEXT,
-                        soft_skills TEXT,
-                        education TEXT,
-                        previous_roles TEXT,
-                        skills_analysis TEXT,
-                        job_matches TEXT,
-                        status VARCHAR(50),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                db.commit()
-                print("Resumes table created successfully")
-                
-                # Try insert again
-                cursor.execute("""
-                    INSERT INTO resumes (user_id, filename, candidate_name, experience_years, 
-                                       technical_skills, soft_skills, education, previous_roles, 
-                                       skills_analysis, job_matches, status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'Analyzed')
-                """, (user_id, file.filename, "", 0, "", "", "", "", skills_analysis, job_matches))
-                print("Resume inserted after table creation")
-            
-            db.commit()
-            print("Database commit successful")
-        except Exception as e:
-            print(f"Database error: {str(e)}")
-            return JSONResponse(content={"error": f"Database error: {str(e)}"})
-        
-        return {
-            "success": True,
-            "filename": file.filename,
-            "skills_analysis": skills_analysis,
-            "job_matches": job_matches
-        }
+        result = await run_in_threadpool(_analyze_resume, file_path, file.filename, user_id, sha256)
+        return JSONResponse(content=result)
     except Exception as e:
         print(f"General error in resume upload: {str(e)}")
         return JSONResponse(content={"error": f"Resume upload failed: {str(e)}"})
 
 @app.get("/resumes/")
-def get_resumes(user_id: int):
+def get_resumes(user_id: int, db=Depends(get_db)):
     """Get all resumes for a user"""
-    db = get_db()
     cursor = db.cursor(dictionary=True)
     
     try:
@@ -552,63 +653,85 @@ def get_resumes(user_id: int):
         # If table doesn't exist, return empty
         return []
 
+RESUME_FIELDS = ("id", "user_id", "filename", "candidate_name", "experience_years", "technical_skills", "soft_skills",
+                 "education", "previous_roles", "skills_analysis", "job_matches", "status", "created_at")
+RESUME_SUMMARY_FIELDS = ("id", "filename", "candidate_name", "experience_years", "status", "created_at")
+
+@app.get("/resumes/page/")
+def get_resumes_page(user_id: int, limit: int = 25, cursor: str = None, status: str = None, fields: str = None,
+                     db=Depends(get_db)):
+    """Keyset-paginated resume list; summary columns only unless fields= asks for more"""
+    try:
+        columns = parse_fields(fields, RESUME_FIELDS, RESUME_SUMMARY_FIELDS)
+        return keyset_page(db, "resumes", user_id, columns, {"status": status}, limit, cursor)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
 @app.post("/search_candidates/")
-def search_candidates(user_id: int = Form(...), job_role: str = Form(...), min_experience: int = Form(0)):
-    """Search for candidates matching specific job criteria"""
-    db = get_db()
-    cursor = db.cursor(dictionary=True)
-    
+def search_candidates(user_id: int = Form(...), job_role: str = Form(...), min_experience: int = Form(0),
+                      skills: str = Form(None), min_score: int = Form(0), limit: int = Form(25),
+                      cursor: str = Form(None), db=Depends(get_db)):
+    """Search for candidates matching specific job criteria, best match first.
+
+    skills is a comma-separated list that every candidate must have; pass the
+    returned next_cursor back to get the following page.
+    """
     try:
-        cursor.execute("""
-            SELECT * FROM resumes 
-            WHERE user_id=%s AND job_matches LIKE %s AND experience_years >= %s
-            ORDER BY created_at DESC
-        """, (user_id, f"%{job_role}%", min_experience))
-        return cursor.fetchall()
-    except Exception as e:
-        return []
+        return search_candidate_index(
+            db, user_id, job_role.strip(), skills.split(",") if skills else None,
+            min_experience, min_score, limit, cursor,
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
 
 # ---------------- EXISTING DOCUMENT WORKFLOW ----------------
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
-results_store = []
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+SUPPORTED_EXTENSIONS = (".txt", ".pdf", ".docx")
 
-@app.post("/upload/")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    text = ""
-    filename_lower = file.filename.lower().strip()
-    try:
-        if filename_lower.endswith(".txt"):
-            detected = from_path(file_path).best()
-            text = str(detected) if detected else ""
-        elif filename_lower.endswith(".pdf"):
-            import pdfplumber
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    if len(pdf.pages) == 0:
-                        return JSONResponse(content={"error": f"PDF {file.filename} has no readable pages"})
-                    text = " ".join([page.extract_text() or "" for page in pdf.pages])
-                    if not text.strip():
-                        return JSONResponse(content={"error": f"PDF {file.filename} contains no extractable text"})
-            except Exception as pdf_error:
-                return JSONResponse(content={"error": f"PDF processing failed for {file.filename}", "details": str(pdf_error)})
-        elif filename_lower.endswith(".docx"):
-            from docx import Document
-            doc = Document(file_path)
-            text = " ".join([p.text for p in doc.paragraphs])
-    except Exception as e:
-        return JSONResponse(content={"error": f"Failed to read {file.filename}", "details": str(e)})
-    
-    if not text.strip():
-        return JSONResponse(content={"error": "No readable text found", "filename": file.filename})
-    
-    summary = call_llama3(f"Summarize this document:\n{text[:2000]}")
+def _save_upload(file: UploadFile):
+    """Stream an upload into UPLOAD_DIR while hashing it. Returns (file_path, sha256)."""
+    return save_stream(file.file, UPLOAD_DIR, file.filename)
+
+def _extract_cached(file_path: str, filename: str, sha256: str, max_chars: int = None):
+    """extract_text_pooled() behind the content-hash text cache. Returns (text, error)."""
+    text = content_store.get_text(sha256, max_chars)
+    if text is not None:
+        return text, None
+    text, error, meta = extract_text_pooled(file_path, filename, max_chars)
+    if not error:
+        content_store.put_text(sha256, text, meta, max_chars)
+    return text, error
+
+def _record_result(result: dict, file_path: str, sha256: str):
+    """Store a document result, make it keyword-searchable and queue its content for retrieval indexing."""
+    results_repo.add(result, file_path, sha256)
+    entities = result.get("entities") or {}
+    search_index.index("document", sha256, title=result["filename"], summary=result.get("summary"),
+                       entities=entities, body=entities.get("raw", ""))
+    if not vector_index.has_source("documents", sha256):
+        job_queue.submit("index_document", {"file_path": file_path, "filename": result["filename"], "sha256": sha256})
+
+def _evict_documents(sha256s: list):
+    """Forget content whose every upload is gone, so /search and /query stop citing it."""
+    for sha256 in sha256s:
+        search_index.remove("document", sha256)
+        vector_index.remove("documents", sha256)
+
+# Department-specific fields merged into a document's entities; the support
+# and HR extractors only return a raw LLM reply, which the rules already cover
+DEPARTMENT_EXTRACTORS = {
+    "Finance": extract_finance_fields,
+    "Legal": extract_legal_fields,
+}
+
+def _document_result(filename: str, text: str, summary: str) -> dict:
     dept = classify_department(text)
     entities = extract_entities(text)
+    extractor = DEPARTMENT_EXTRACTORS.get(dept)
+    if extractor is not None:
+        entities.update(extractor(text))
     
     # Add raw text to entities for workflow analysis
     entities["raw"] = text
@@ -616,48 +739,392 @@ async def upload_file(file: UploadFile = File(...)):
     
     workflow = generate_workflow(dept, entities)
     
-    result = {
-        "filename": file.filename,
+    return {
+        "filename": filename,
         "department": dept,
         "summary": summary,
         "entities": entities,
         "workflow_outcome": workflow["outcome"],
         "workflow_checklist": workflow["checklist"]
     }
+
+def _batch_document_result(filename: str, text: str, summary: str) -> dict:
+    with llm_request("batch"):
+        return _document_result(filename, text, summary)
+
+def _analyze_document(file_path: str, filename: str, sha256: str) -> dict:
+    """Full document pipeline; identical content reuses its earlier analysis."""
+    cached = content_store.get_analysis(sha256, "document")
+    if cached is not None:
+        result = {**cached, "filename": filename}
+    else:
+        text, error = _extract_cached(file_path, filename, sha256)
+        if error:
+            return error
+        
+        summary = run_tiered(
+            "document_summary",
+            lambda: invoice_summary(text),
+            lambda: call_llama3(document_summary_prompt(text), task="summary"),
+        )
+        result = _document_result(filename, text, summary)
+        content_store.put_analysis(sha256, "document", result)
     
-    results_store.append(result)
+    _record_result(result, file_path, sha256)
+    return result
+
+@app.post("/upload/")
+async def upload_file(file: UploadFile = File(...)):
+    file_path, sha256 = await run_in_threadpool(_save_upload, file)
+    result = await run_in_threadpool(_analyze_document, file_path, file.filename, sha256)
     return JSONResponse(content=result)
 
-@app.get("/results/")
-async def get_results():
-    # Filter out entries whose source files have been removed from UPLOAD_DIR
-    existing = []
-    for r in results_store:
+@app.post("/upload/stream/")
+def upload_file_stream(file: UploadFile = File(...)):
+    """SSE variant of /upload/: sends classification first, then summary tokens, then the workflow"""
+    file_path, sha256 = _save_upload(file)
+    
+    def events():
+        cached = content_store.get_analysis(sha256, "document")
+        if cached is not None:
+            result = {**cached, "filename": file.filename}
+            _record_result(result, file_path, sha256)
+            yield _sse("department", {"department": result["department"]})
+            yield _sse("summary", {"summary": result["summary"]})
+            yield _sse("done", result)
+            return
+        
+        text, error = _extract_cached(file_path, file.filename, sha256)
+        if error:
+            yield _sse("error", error)
+            return
+        
+        yield _sse("department", {"department": classify_department(text)})
+        summary = try_rules("document_summary", lambda: invoice_summary(text))
+        if summary is not None:
+            yield _sse("summary", {"summary": summary})
+            result = _document_result(file.filename, text, summary)
+            content_store.put_analysis(sha256, "document", result)
+            _record_result(result, file_path, sha256)
+            yield _sse("done", result)
+            return
+        tier_stats.record("document_summary", "llm")
         try:
-            path = os.path.join(UPLOAD_DIR, r.get("filename", ""))
-            if path and os.path.exists(path):
-                existing.append(r)
-        except Exception:
-            # If any issue occurs while checking, skip that entry
-            pass
+            parts = []
+            for token in stream_llama3(document_summary_prompt(text), task="summary"):
+                parts.append(token)
+                yield _sse("summary_token", {"text": token})
+        except LLMError as e:
+            yield _sse("error", {"message": str(e)})
+            return
+        summary = "".join(parts).strip()
+        yield _sse("summary", {"summary": summary})
+        
+        result = _document_result(file.filename, text, summary)
+        content_store.put_analysis(sha256, "document", result)
+        _record_result(result, file_path, sha256)
+        yield _sse("done", result)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+# Zip bombs and archives of thousands of files are refused before anything is analyzed
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "500"))
+ZIP_MAX_BYTES = int(os.getenv("ZIP_MAX_BYTES", str(500 * 1024 * 1024)))
+
+class ZipLimitExceeded(ValueError):
+    pass
+
+class _LimitedReader:
+    """File wrapper that fails once more than `budget[0]` bytes have been read through any wrapper sharing it."""
+
+    def __init__(self, source, budget: list):
+        self.source = source
+        self.budget = budget
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.source.read(size)
+        self.budget[0] -= len(chunk)
+        if self.budget[0] < 0:
+            raise ZipLimitExceeded(f"Archive expands to more than {ZIP_MAX_BYTES} bytes")
+        return chunk
+
+def _zip_member_name(archive_name: str, member_name: str) -> str:
+    # Directories become part of the name: a/invoice.pdf and b/invoice.pdf stay distinct,
+    # and no path component can climb out of UPLOAD_DIR
+    parts = [p for p in member_name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    stem = os.path.splitext(os.path.basename(archive_name))[0]
+    return "__".join([stem, *parts])
+
+def _save_zip_members(file: UploadFile) -> list:
+    """Unpack supported documents from an uploaded zip into UPLOAD_DIR. Returns [(file_path, filename, sha256)]."""
+    saved = []
+    with zipfile.ZipFile(file.file) as archive:
+        members = [
+            m for m in archive.infolist()
+            if not m.is_dir() and m.filename.lower().endswith(SUPPORTED_EXTENSIONS)
+        ]
+        if len(members) > ZIP_MAX_MEMBERS:
+            raise ZipLimitExceeded(f"Archive has {len(members)} documents, the limit is {ZIP_MAX_MEMBERS}")
+        if sum(m.file_size for m in members) > ZIP_MAX_BYTES:
+            raise ZipLimitExceeded(f"Archive expands to more than {ZIP_MAX_BYTES} bytes")
+        # Declared sizes can lie; the shared budget also bounds what is actually inflated
+        budget = [ZIP_MAX_BYTES]
+        for member in members:
+            filename = _zip_member_name(file.filename, member.filename)
+            with archive.open(member) as source:
+                file_path, sha256 = save_stream(_LimitedReader(source, budget), UPLOAD_DIR, filename)
+            saved.append((file_path, os.path.basename(member.filename), sha256))
+    return saved
+
+def _save_batch(files: List[UploadFile]) -> list:
+    saved = []
+    for file in files:
+        if file.filename.lower().endswith(".zip"):
+            try:
+                saved.extend(_save_zip_members(file))
+            except zipfile.BadZipFile as e:
+                raise zipfile.BadZipFile(f"{file.filename}: {e}") from e
+        else:
+            file_path, sha256 = _save_upload(file)
+            saved.append((file_path, file.filename, sha256))
+    return saved
+
+@app.post("/upload/batch/")
+async def upload_batch(files: List[UploadFile] = File(...)):
+    """Analyze many documents (or zip archives of documents) in one request"""
+    started = time.perf_counter()
+    timing = {}
+    
+    # Unzipping and hashing are blocking file I/O
+    try:
+        saved = await run_in_threadpool(_save_batch, files)
+    except zipfile.BadZipFile as e:
+        return JSONResponse(content={"error": "Invalid zip archive", "details": str(e)})
+    except ZipLimitExceeded as e:
+        return JSONResponse(status_code=413, content={"error": "Zip archive too large", "details": str(e)})
+    timing["save_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    # Content seen before skips extraction and the LLM entirely
+    cached = [content_store.get_analysis(sha256, "document") for _, _, sha256 in saved]
+    pending = [i for i, hit in enumerate(cached) if hit is None]
+    
+    # CPU-bound parsing runs in the process pool, all files at once
+    t0 = time.perf_counter()
+    extracted = await asyncio.gather(
+        *[run_in_threadpool(_extract_cached, *saved[i]) for i in pending]
+    )
+    timing["extract_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    
+    # Summaries are bounded so one batch cannot take every LLM slot
+    t0 = time.perf_counter()
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    
+    async def summarize(text: str) -> str:
+        # Templated invoices never take an LLM slot
+        summary = try_rules("document_summary", lambda: invoice_summary(text))
+        if summary is not None:
+            return summary
+        tier_stats.record("document_summary", "llm")
+        async with semaphore:
+            return await acall_llama3(document_summary_prompt(text), priority="batch", task="summary")
+    
+    summaries = await asyncio.gather(
+        *[summarize(text) for text, error in extracted if not error],
+        return_exceptions=True,
+    )
+    timing["summarize_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    
+    t0 = time.perf_counter()
+    analyzed = {}
+    ready = []
+    summary_iter = iter(summaries)
+    for i, (text, error) in zip(pending, extracted):
+        file_path, filename, sha256 = saved[i]
+        if error:
+            analyzed[i] = {"filename": filename, **error}
+            continue
+        summary = next(summary_iter)
+        if isinstance(summary, Exception):
+            analyzed[i] = {"filename": filename, "error": f"Summary failed for {filename}", "details": str(summary)}
+            continue
+        ready.append((i, text, summary))
+    
+    async def analyze(i: int, text: str, summary: str):
+        # Department extractors may call the LLM; keep them off the event loop and within the batch's share
+        async with semaphore:
+            result = await run_in_threadpool(_batch_document_result, saved[i][1], text, summary)
+        content_store.put_analysis(saved[i][2], "document", result)
+        analyzed[i] = result
+    
+    outcomes = await asyncio.gather(*[analyze(*item) for item in ready], return_exceptions=True)
+    for (i, _, _), outcome in zip(ready, outcomes):
+        if isinstance(outcome, Exception):
+            analyzed[i] = {"filename": saved[i][1], "error": f"Analysis failed for {saved[i][1]}", "details": str(outcome)}
+    
+    results = []
+    for i, ((file_path, filename, sha256), hit) in enumerate(zip(saved, cached)):
+        result = {**hit, "filename": filename} if hit is not None else analyzed[i]
+        if "error" not in result:
+            _record_result(result, file_path, sha256)
+        results.append(result)
+    timing["analyze_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    timing["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    failed = sum(1 for r in results if "error" in r)
+    duplicates = sum(1 for hit in cached if hit is not None)
+    print(f"[upload_batch] files={len(results)} failed={failed} duplicates={duplicates} " + " ".join(f"{k}={v}" for k, v in timing.items()))
+    return {
+        "count": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "duplicates": duplicates,
+        "results": results,
+        "timing": timing
+    }
+
+@app.get("/results/")
+def get_results(department: str = None, outcome: str = None):
+    # Results for deleted uploads are hidden by the background reconciler
+    return results_repo.find(department=department, outcome=outcome)
 
-    # Keep in-memory store consistent if anything was removed
-    if len(existing) != len(results_store):
-        results_store[:] = existing
+@app.get("/results/page/")
+def get_results_page(department: str = None, outcome: str = None, since: float = None, until: float = None,
+                     sha256: str = None, limit: int = 25, cursor: str = None):
+    """Newest-first page of document results; since/until are Unix timestamps"""
+    try:
+        return results_repo.page(department, outcome, since, until, sha256, limit, cursor)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
 
-    return existing
+def _document_context(question: str):
+    context, sources = _retrieve_context("documents", question)
+    if context is None:
+        context, sources = _keyword_context("document", question)
+    if context is None:
+        context = " ".join(results_repo.summaries(limit=RAG_FALLBACK_ITEMS))
+    return context, sources
 
 @app.post("/query/")
 async def query_docs(question: str = Form(...)):
-    all_texts = " ".join([r["summary"] for r in results_store])
-    answer = call_llama3(f"Answer this based on docs:\n{all_texts}\nQuestion: {question}")
-    return {"answer": answer}
+    # Embedding the question is a blocking HTTP call
+    context, sources = await run_in_threadpool(_document_context, question)
+    answer = await acall_llama3(docs_query_prompt(context, question), priority="interactive")
+    return {"answer": answer, "sources": sources}
+
+@app.post("/query/stream/")
+def query_docs_stream(question: str = Form(...)):
+    """SSE variant of /query/"""
+    def events():
+        context, sources = _document_context(question)
+        yield _sse("sources", {"sources": sources})
+        parts = []
+        try:
+            for token in stream_llama3(docs_query_prompt(context, question), priority="interactive"):
+                parts.append(token)
+                yield _sse("answer_token", {"text": token})
+        except LLMError as e:
+            yield _sse("error", {"message": str(e)})
+            return
+        yield _sse("done", {"answer": "".join(parts).strip(), "sources": sources})
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/search")
+def keyword_search(q: str, kind: str = None, user_id: int = None, limit: int = 10):
+    """BM25 keyword search over documents and (with user_id) the user's tickets; no LLM involved"""
+    started = time.perf_counter()
+    results = search_index.search(q, kinds=(kind,) if kind else None, user_id=user_id, limit=limit)
+    return {"results": results, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+@app.post("/workflow/reevaluate/")
+def reevaluate_workflows(department: str = Form(None)):
+    """Re-run the current workflow rules over stored results and report which outcomes would change"""
+    results = results_repo.find(department=department)
+    workflows = workflow_engine.evaluate_many((r["department"], r.get("entities") or {}) for r in results)
+    changed = [
+        {"filename": r["filename"], "department": r["department"], "previous_outcome": r.get("workflow_outcome"), "outcome": w["outcome"]}
+        for r, w in zip(results, workflows)
+        if w["outcome"] != r.get("workflow_outcome")
+    ]
+    return {"evaluated": len(results), "changed": len(changed), "results": changed}
 
 @app.get("/download_docs/")
 async def download_docs_csv():
-    if not results_store:
+    results = results_repo.find()
+    if not results:
         return {"error": "No data available"}
-    df = pd.DataFrame(results_store)
+    df = pd.DataFrame(results)
     csv_path = "results_docs.csv"
     df.to_csv(csv_path, index=False)
     return FileResponse(csv_path, filename="results_docs.csv")
+
+# ---------------- BACKGROUND JOBS ----------------
+job_queue = JobQueue()
+
+def _batch_job(handler):
+    """Background jobs never compete with request traffic for LLM slots."""
+    @functools.wraps(handler)
+    def run(**payload):
+        with llm_request("batch", payload.get("user_id")):
+            return handler(**payload)
+    return run
+
+job_queue.register("document", _batch_job(_analyze_document))
+def _index_document(file_path: str, filename: str, sha256: str) -> dict:
+    if vector_index.has_source("documents", sha256):
+        return {"chunks": 0, "skipped": True}
+    text, error = _extract_cached(file_path, filename, sha256)
+    if error:
+        return error
+    return {"chunks": vector_index.add("documents", sha256, text)}
+
+job_queue.register("index_document", _batch_job(_index_document))
+job_queue.register("index_ticket", _batch_job(lambda ticket_id, user_id, text: {
+    "chunks": vector_index.add("tickets", f"ticket:{ticket_id}", text, owner_id=user_id)
+}))
+def _refresh_suggestion(entry_id: int, category: str, description: str) -> dict:
+    suggestion = None
+    try:
+        suggestion = generate_it_suggestion(category, description)
+    finally:
+        # Releases the claim even when generation fails, so a later hit can retry
+        suggestion_cache.refresh(entry_id, suggestion)
+    return {"refreshed": True}
+
+job_queue.register("refresh_suggestion", _batch_job(_refresh_suggestion))
+job_queue.register("resume", _batch_job(
+    lambda file_path, filename, user_id, sha256: _analyze_resume(file_path, filename, user_id, sha256, retryable=True)
+))
+
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.start()
+    results_repo.start_reconciler(on_removed=_evict_documents)
+    llm_client.router.start_health_checks(llm_client.session)
+
+@app.on_event("shutdown")
+def stop_job_queue():
+    job_queue.shutdown()
+    results_repo.stop_reconciler()
+    llm_client.router.stop_health_checks()
+
+@app.post("/jobs/upload/")
+async def submit_upload_job(file: UploadFile = File(...)):
+    """Queue a document for background analysis; poll /jobs/{job_id} for the result"""
+    file_path, sha256 = await run_in_threadpool(_save_upload, file)
+    job_id = job_queue.submit("document", {"file_path": file_path, "filename": file.filename, "sha256": sha256})
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/upload_resume/")
+async def submit_resume_job(file: UploadFile = File(...), user_id: int = Form(...)):
+    """Queue a resume for background analysis; poll /jobs/{job_id} for the result"""
+    file_path, sha256 = await run_in_threadpool(_save_upload, file)
+    job_id = job_queue.submit("resume", {"file_path": file_path, "filename": file.filename, "user_id": user_id, "sha256": sha256})
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return job
@@ -0,0 +1,211 @@
+import threading
+
+# Versioned schema changes, applied once at startup and recorded in
+# schema_migrations. Request handlers never issue DDL.
+
+
+def _create_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) NOT NULL UNIQUE,
+            password VARCHAR(255) NOT NULL,
+            department VARCHAR(50)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tickets (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            category VARCHAR(100),
+            description TEXT,
+            ai_summary TEXT,
+            ai_suggestion TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _add_ticket_status(cursor):
+    _add_column_if_missing(cursor, "tickets", "status", "VARCHAR(20) DEFAULT 'Open'")
+
+
+def _add_ticket_escalation_reason(cursor):
+    _add_column_if_missing(cursor, "tickets", "escalation_reason", "TEXT")
+
+
+def _add_ticket_reporting_columns(cursor):
+    _add_column_if_missing(cursor, "tickets", "affected_user", "VARCHAR(255)")
+    _add_column_if_missing(cursor, "tickets", "ticket_type", "VARCHAR(20) DEFAULT 'self'")
+
+
+def _create_resumes_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS resumes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            filename VARCHAR(255),
+            candidate_name VARCHAR(255),
+            experience_years INT,
+            technical_skills TEXT,
+            soft_skills TEXT,
+            education TEXT,
+            previous_roles TEXT,
+            skills_analysis TEXT,
+            job_matches TEXT,
+            status VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _add_listing_indexes(cursor):
+    # Keyset pagination walks (user_id, [filter,] created_at, id) newest first
+    _add_index_if_missing(cursor, "tickets", "idx_tickets_user_created", "user_id, created_at, id")
+    _add_index_if_missing(cursor, "tickets", "idx_tickets_user_status_created", "user_id, status, created_at, id")
+    _add_index_if_missing(cursor, "tickets", "idx_tickets_user_category_created", "user_id, category, created_at, id")
+    _add_index_if_missing(cursor, "resumes", "idx_resumes_user_created", "user_id, created_at, id")
+    _add_index_if_missing(cursor, "resumes", "idx_resumes_user_status_created", "user_id, status, created_at, id")
+
+
+def _create_candidate_index(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS candidate_skills (
+            resume_id INT NOT NULL,
+            user_id INT NOT NULL,
+            skill VARCHAR(100) NOT NULL,
+            kind VARCHAR(20) NOT NULL,
+            PRIMARY KEY (resume_id, kind, skill),
+            INDEX idx_candidate_skills_user_skill (user_id, skill, resume_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS candidate_roles (
+            resume_id INT NOT NULL,
+            user_id INT NOT NULL,
+            role VARCHAR(100) NOT NULL,
+            score INT NOT NULL,
+            fit VARCHAR(20),
+            PRIMARY KEY (resume_id, role),
+            INDEX idx_candidate_roles_user_role_score (user_id, role, score, resume_id)
+        )
+    """)
+
+
+def _backfill_candidate_index(cursor):
+    # Resumes stored before the index existed only have the raw LLM replies
+    from candidates import index_candidate, parse_job_matches, parse_skills_analysis, profile_columns
+
+    cursor.execute("SELECT id, user_id, skills_analysis, job_matches FROM resumes")
+    for resume_id, user_id, skills_analysis, job_matches in cursor.fetchall():
+        profile = parse_skills_analysis(skills_analysis)
+        columns = profile_columns(profile)
+        cursor.execute(
+            f"UPDATE resumes SET {', '.join(f'{c}=%s' for c in columns)} WHERE id=%s",
+            (*columns.values(), resume_id),
+        )
+        index_candidate(cursor, resume_id, user_id, profile, parse_job_matches(job_matches))
+
+
+def _normalize_candidate_roles(cursor):
+    # Roles were stored as the LLM spelled them; re-derive them through normalize_role
+    from candidates import index_candidate, parse_job_matches, parse_skills_analysis
+
+    cursor.execute("SELECT id, user_id, skills_analysis, job_matches FROM resumes")
+    for resume_id, user_id, skills_analysis, job_matches in cursor.fetchall():
+        index_candidate(cursor, resume_id, user_id, parse_skills_analysis(skills_analysis),
+                        parse_job_matches(job_matches))
+
+
+MIGRATIONS = [
+    (1, "create users and tickets tables", _create_base_tables),
+    (2, "add tickets.status", _add_ticket_status),
+    (3, "add tickets.escalation_reason", _add_ticket_escalation_reason),
+    (4, "add tickets.affected_user and tickets.ticket_type", _add_ticket_reporting_columns),
+    (5, "create resumes table", _create_resumes_table),
+    (6, "add composite indexes for paginated listings", _add_listing_indexes),
+    (7, "create candidate_skills and candidate_roles", _create_candidate_index),
+    (8, "backfill candidate index from stored analyses", _backfill_candidate_index),
+    (9, "normalize candidate role names", _normalize_candidate_roles),
+]
+
+
+# ------------------- SCHEMA INTROSPECTION -------------------
+_columns_cache = {}
+_columns_lock = threading.Lock()
+
+
+def _load_columns(cursor, table: str) -> set:
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,),
+    )
+    return {row[0] if isinstance(row, (tuple, list)) else row["COLUMN_NAME"] for row in cursor.fetchall()}
+
+
+def table_columns(db, table: str) -> set:
+    """Column names of a table, looked up once per process."""
+    with _columns_lock:
+        if table in _columns_cache:
+            return _columns_cache[table]
+    cursor = db.cursor()
+    columns = _load_columns(cursor, table)
+    cursor.close()
+    with _columns_lock:
+        _columns_cache[table] = columns
+    return columns
+
+
+def _add_column_if_missing(cursor, table: str, column: str, definition: str):
+    # MySQL has no ADD COLUMN IF NOT EXISTS
+    if column not in _load_columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _add_index_if_missing(cursor, table: str, index: str, columns: str):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index),
+    )
+    if not cursor.fetchall():
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+
+# ------------------- RUNNER -------------------
+def run_migrations(db) -> list:
+    """Apply pending migrations in version order. Returns the versions applied.
+
+    A MySQL named lock keeps several workers starting at once from racing.
+    """
+    cursor = db.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT GET_LOCK('schema_migrations', 60)")
+    cursor.fetchall()
+    applied = []
+    try:
+        cursor.execute("SELECT version FROM schema_migrations")
+        done = {row[0] for row in cursor.fetchall()}
+        for version, description, apply in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"Applying migration {version}: {description}")
+            apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (version, description),
+            )
+            db.commit()
+            applied.append(version)
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK('schema_migrations')")
+        cursor.fetchall()
+        cursor.close()
+        with _columns_lock:
+            _columns_cache.clear()
+    return applied
@@ -0,0 +1,67 @@
+import json
+
+# Timing fields Ollama reports on the final ("done": true) chunk, in nanoseconds
+DURATION_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+COUNT_FIELDS = ("prompt_eval_count", "eval_count")
+
+
+class OllamaStreamError(Exception):
+    """Raised when the stream carries an error object or a malformed line."""
+
+
+class OllamaStreamDecoder:
+    """Incremental decoder for Ollama's NDJSON generate stream.
+
+    Each line is a complete JSON object, so it is decoded with json.loads
+    (which handles escaped quotes and \\u sequences) and the token text is
+    collected in a list and joined once at the end.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.done_reason = None
+        self.stats = {}
+
+    def feed(self, line) -> str:
+        """Decode one NDJSON line and return the token text it carried ("" if none)."""
+        if self.done or not line:
+            return ""
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            return ""
+        try:
+            chunk = json.loads(line)
+        except ValueError as e:
+            raise OllamaStreamError(f"Malformed stream line: {line[:200]}") from e
+
+        if "error" in chunk:
+            raise OllamaStreamError(str(chunk["error"]))
+
+        token = chunk.get("response", "")
+        if token:
+            self.parts.append(token)
+
+        if chunk.get("done"):
+            self.done = True
+            self.done_reason = chunk.get("done_reason")
+            for field in DURATION_FIELDS + COUNT_FIELDS:
+                if field in chunk:
+                    self.stats[field] = chunk[field]
+        return token
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+def iter_tokens(lines, decoder: OllamaStreamDecoder = None):
+    """Yield token text from an iterable of NDJSON lines until the done chunk."""
+    decoder = decoder or OllamaStreamDecoder()
+    for line in lines:
+        token = decoder.feed(line)
+        if token:
+            yield token
+        if decoder.done:
+            break
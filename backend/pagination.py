@@ -0,0 +1,73 @@
+import base64
+import json
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id: int) -> str:
+    raw = json.dumps([str(created_at), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return created_at, int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def parse_fields(fields: str, allowed: tuple, default: tuple) -> list:
+    """Validate a comma-separated projection; id and created_at are always included for the cursor."""
+    if not fields:
+        selected = list(default)
+    else:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    for key in ("created_at", "id"):
+        if key not in selected:
+            selected.insert(0, key)
+    return selected
+
+
+def keyset_page(db, table: str, user_id: int, columns: list, filters: dict = None, limit: int = 25, cursor: str = None) -> dict:
+    """One page of a user's rows, newest first, keyed on (user_id, created_at, id).
+
+    Filters are equality conditions on whitelisted columns; the matching
+    composite index is (user_id, <filter>, created_at, id).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    where = ["user_id = %s"]
+    params = [user_id]
+    for column, value in (filters or {}).items():
+        if value is not None:
+            where.append(f"{column} = %s")
+            params.append(value)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        where.append("(created_at < %s OR (created_at = %s AND id < %s))")
+        params.extend([created_at, created_at, row_id])
+
+    sql = (
+        f"SELECT {', '.join(columns)} FROM {table} WHERE {' AND '.join(where)} "
+        f"ORDER BY created_at DESC, id DESC LIMIT %s"
+    )
+    params.append(limit + 1)
+
+    db_cursor = db.cursor(dictionary=True)
+    db_cursor.execute(sql, params)
+    rows = db_cursor.fetchall()
+    db_cursor.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return {"items": rows, "next_cursor": next_cursor}
@@ -0,0 +1,330 @@
+import os
+import re
+import threading
+
+# Every prompt puts its fixed instructions first and the variable text last,
+# so consecutive calls share a prefix that Ollama can keep in its KV cache.
+
+# Token budgets for the variable part of each prompt (env: PROMPT_BUDGET_<NAME>)
+PROMPT_BUDGETS = {
+    name: int(os.getenv(f"PROMPT_BUDGET_{name.upper()}", str(default)))
+    for name, default in {
+        "document_summary": 600,
+        "ticket_summary": 600,
+        "resume_skills": 900,
+        "job_matching": 800,
+        "docs_query": 1500,
+        "ticket_query": 1200,
+        "it_suggestion": 400,
+        "vendor_extraction": 500,
+        "parties_extraction": 800,
+        "support_classification": 600,
+        "hr_feedback": 600,
+    }.items()
+}
+# Upper bound on characters per token, for sizing text before it is counted
+MAX_CHARS_PER_TOKEN = 6
+TRUNCATION_MARKER = "\n[...]\n"
+
+# Roughly how llama-family BPE splits text: short word pieces and single symbols
+_TOKEN = re.compile(r"\w{1,4}|[^\w\s]")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES = re.compile(r"\n\s*\n+")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count; no tokenizer for the served model is available here."""
+    return sum(1 for _ in _TOKEN.finditer(text or ""))
+
+
+def chars_for(budget: str) -> int:
+    """Characters to extract so that, after compaction, the budget can still be filled."""
+    return PROMPT_BUDGETS[budget] * MAX_CHARS_PER_TOKEN
+
+
+def compact(text: str) -> str:
+    """Collapse whitespace and drop repeated lines (page headers, footers, signatures)."""
+    seen = set()
+    lines = []
+    for line in _SPACES.sub(" ", text or "").split("\n"):
+        line = line.strip()
+        key = line.lower()
+        if len(key) > 3 and key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _head(text: str, tokens: int) -> str:
+    for i, match in enumerate(_TOKEN.finditer(text)):
+        if i == tokens:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def _tail(text: str, tokens: int) -> str:
+    window = text[-tokens * MAX_CHARS_PER_TOKEN:]
+    matches = list(_TOKEN.finditer(window))
+    if len(matches) <= tokens:
+        return window.lstrip()
+    return window[matches[-tokens].start():]
+
+
+def truncate(text: str, max_tokens: int, head_ratio: float = 0.7) -> str:
+    """Fit text into max_tokens keeping its head and tail.
+
+    Documents state what they are at the top and carry totals, signatures
+    and conclusions at the bottom, so the middle is what gets dropped.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    max_tokens -= count_tokens(TRUNCATION_MARKER)
+    head_tokens = int(max_tokens * head_ratio)
+    return _head(text, head_tokens) + TRUNCATION_MARKER + _tail(text, max_tokens - head_tokens)
+
+
+SECTION_SEPARATOR = "\n---\n"
+
+
+def fit_sections(sections: list, max_tokens: int, separator: str = SECTION_SEPARATOR) -> str:
+    """Join sections (most relevant first) until the budget is spent; the last one may be cut."""
+    out, used = [], 0
+    for section in sections:
+        section = compact(section)
+        tokens = count_tokens(section)
+        if used + tokens > max_tokens:
+            remaining = max_tokens - used
+            if remaining > 50:
+                out.append(_head(section, remaining))
+            break
+        out.append(section)
+        used += tokens
+    return separator.join(out)
+
+
+class PromptStats:
+    """Estimated tokens of variable input per prompt, before and after compaction."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def record(self, name: str, raw_tokens: int, sent_tokens: int):
+        with self._lock:
+            entry = self.counts.setdefault(name, {"prompts": 0, "raw_tokens": 0, "sent_tokens": 0})
+            entry["prompts"] += 1
+            entry["raw_tokens"] += raw_tokens
+            entry["sent_tokens"] += sent_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.counts.items()}
+
+
+prompt_stats = PromptStats()
+
+
+def fit(name: str, text: str) -> str:
+    """Compact and truncate text to the budget for prompt `name`, recording the saving."""
+    text = text or ""
+    raw_tokens = count_tokens(text)
+    fitted = truncate(compact(text), PROMPT_BUDGETS[name])
+    prompt_stats.record(name, raw_tokens, count_tokens(fitted))
+    return fitted
+
+
+# ------------------- PROMPTS -------------------
+def document_summary_prompt(text: str) -> str:
+    return f"Summarize this document:\n{fit('document_summary', text)}"
+
+
+def ticket_summary_prompt(full_description: str) -> str:
+    return f"Summarize this IT ticket: {fit('ticket_summary', full_description)}"
+
+
+def docs_query_prompt(context, question: str) -> str:
+    """context is a list of sections (most relevant first) or one string."""
+    sections = context if isinstance(context, list) else [context]
+    fitted = fit_sections(sections, PROMPT_BUDGETS["docs_query"])
+    prompt_stats.record("docs_query", count_tokens(SECTION_SEPARATOR.join(sections)), count_tokens(fitted))
+    return f"Answer this based on docs:\n{fitted}\nQuestion: {question}"
+
+
+def ticket_query_prompt(context, question: str) -> str:
+    sections = context if isinstance(context, list) else [context]
+    fitted = fit_sections(sections, PROMPT_BUDGETS["ticket_query"])
+    prompt_stats.record("ticket_query", count_tokens(SECTION_SEPARATOR.join(sections)), count_tokens(fitted))
+    return f"User submitted IT tickets summaries:\n{fitted}\nQuestion: {question}"
+
+
+RESUME_SKILLS_INSTRUCTIONS = """Analyze the resume below and extract:
+1. Candidate name
+2. Years of experience
+3. Technical skills (programming languages, tools, frameworks)
+4. Soft skills (communication, leadership, etc.)
+5. Education background
+6. Previous job roles
+
+Return as JSON format:
+{
+    "name": "candidate name",
+    "experience_years": number,
+    "technical_skills": ["skill1", "skill2"],
+    "soft_skills": ["skill1", "skill2"],
+    "education": "degree and institution",
+    "previous_roles": ["role1", "role2"]
+}
+"""
+
+
+def resume_skills_prompt(text: str) -> str:
+    return f"{RESUME_SKILLS_INSTRUCTIONS}\nResume: {fit('resume_skills', text)}"
+
+
+# Roles job matching scores candidates against; candidate search maps LLM role names onto these
+JOB_ROLES = [
+    ("Frontend Developer", "React, Vue, Angular, JavaScript, HTML, CSS"),
+    ("Backend Developer", "Python, Java, Node.js, SQL, APIs"),
+    ("Full Stack Developer", "Frontend + Backend skills"),
+    ("Data Analyst", "SQL, Python, Excel, Tableau, PowerBI"),
+    ("DevOps Engineer", "Docker, Kubernetes, AWS, CI/CD"),
+    ("UI/UX Designer", "Figma, Adobe, User Research, Prototyping"),
+    ("Project Manager", "Agile, Scrum, Leadership, Communication"),
+    ("Business Analyst", "Requirements, Documentation, Stakeholder Management"),
+    ("QA Engineer", "Testing, Automation, Selenium, JUnit"),
+    ("Support Engineer", "Customer Service, Technical Support, Troubleshooting"),
+    ("Sales Executive", "Sales, CRM, Communication, Negotiation"),
+    ("Marketing Specialist", "Digital Marketing, SEO, Social Media, Analytics"),
+    ("Finance Analyst", "Accounting, Excel, Financial Modeling, Analysis"),
+    ("HR Specialist", "Recruitment, Employee Relations, HRIS, Compliance"),
+    ("Operations Manager", "Process Improvement, Team Management, Logistics"),
+]
+
+JOB_MATCHING_INSTRUCTIONS = """Based on the candidate profile below, analyze their fit for different job roles.
+
+Available job roles:
+""" + "\n".join(f"{i}. {role} ({skills})" for i, (role, skills) in enumerate(JOB_ROLES, 1)) + """
+
+Return ONLY a JSON array with this exact format:
+[
+  {"role": "Role Name", "match": 85, "fit": "High"},
+  {"role": "Role Name", "match": 72, "fit": "Medium"}
+]
+
+Rules:
+- Return maximum 3 best-fit roles
+- Match percentage should be 0-100
+- Fit should be "High" (80+), "Medium" (60-79), or "Low" (below 60)
+- Only return the JSON array, no other text
+"""
+
+
+def job_matching_prompt(skills_analysis: str) -> str:
+    return f"{JOB_MATCHING_INSTRUCTIONS}\nCandidate profile:\n{fit('job_matching', skills_analysis)}"
+
+
+# Per-category checklist the suggestion should cover; sent before the ticket text
+IT_SUGGESTION_TOPICS = {
+    "Network & Connectivity": ("step-by-step troubleshooting instructions for network connectivity issues", [
+        "Basic connectivity checks (ping, traceroute)",
+        "VPN connection troubleshooting",
+        "WiFi/Network adapter settings",
+        "Common network configuration fixes",
+        "When to contact network administrator",
+    ]),
+    "Password & Authentication": ("step-by-step instructions for password and authentication issues", [
+        "Password reset procedures",
+        "Account unlock steps",
+        "Multi-factor authentication setup",
+        "Common login troubleshooting",
+        "When to contact system administrator",
+    ]),
+    "Software & Applications": ("step-by-step instructions for software and application issues", [
+        "Software installation procedures",
+        "License activation steps",
+        "Application troubleshooting",
+        "Update and patch procedures",
+        "When to contact software vendor or IT admin",
+    ]),
+    "Hardware Issues": ("step-by-step troubleshooting for hardware issues", [
+        "Basic hardware diagnostics",
+        "Driver updates and installations",
+        "Hardware connection checks",
+        "Common hardware fixes",
+        "When to contact hardware support or replace equipment",
+    ]),
+    "Email & Communication": ("step-by-step instructions for email and communication issues", [
+        "Email client configuration",
+        "Calendar and meeting setup",
+        "Video conferencing troubleshooting",
+        "Email sync and backup procedures",
+        "When to contact email administrator",
+    ]),
+    "Data & File Issues": ("step-by-step instructions for data and file issues", [
+        "File recovery procedures",
+        "Backup and restore steps",
+        "Storage space management",
+        "File permission fixes",
+        "When to contact data recovery specialist",
+    ]),
+    "Security & Permissions": ("step-by-step instructions for security and permission issues", [
+        "Security software configuration",
+        "Permission settings adjustment",
+        "Firewall and antivirus setup",
+        "Security best practices",
+        "When to contact security team",
+    ]),
+    "Account & Access Management": ("step-by-step instructions for account and access management", [
+        "Account creation and setup",
+        "Access permission requests",
+        "Role and profile management",
+        "Account security settings",
+        "When to contact access management team",
+    ]),
+    "General IT Issue": ("general IT troubleshooting steps", [
+        "Basic system diagnostics",
+        "Common IT issue resolution",
+        "System optimization tips",
+        "Best practices for the specific issue",
+        "When to escalate to IT support team",
+    ]),
+}
+
+# Built once: the instruction block per category never changes
+_IT_SUGGESTION_PREFIXES = {
+    category: f"Provide {topic} for the issue below. Include:\n"
+    + "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+    + "\n"
+    for category, (topic, items) in IT_SUGGESTION_TOPICS.items()
+}
+
+
+def it_suggestion_prompt(category: str, description: str) -> str:
+    prefix = _IT_SUGGESTION_PREFIXES.get(category, _IT_SUGGESTION_PREFIXES["General IT Issue"])
+    return f"{prefix}\nCategory: {category}\nIssue: {fit('it_suggestion', description)}"
+
+
+# ------------------- DEPARTMENT EXTRACTORS -------------------
+def vendor_extraction_prompt(text: str) -> str:
+    return f"Extract the vendor/supplier name from this invoice:\n{fit('vendor_extraction', text)}\nVendor:"
+
+
+def parties_extraction_prompt(text: str) -> str:
+    return f"Extract parties in this contract:\n{fit('parties_extraction', text)}\nParties:"
+
+
+def support_classification_prompt(text: str) -> str:
+    return (
+        "Classify the following client complaint. Return JSON with 'category' "
+        "(Refund/Delay/Delivery/Other) and 'priority' (Low/Medium/High).\n"
+        f"Text: {fit('support_classification', text)}"
+    )
+
+
+def hr_feedback_prompt(text: str) -> str:
+    return (
+        "Analyze the employee feedback below. Return JSON with 'sentiment' (Positive/Negative/Neutral) "
+        "and 'category' (Workload, Manager support, Pay, Other).\n"
+        f"Feedback: {fit('hr_feedback', text)}"
+    )
@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+RESULTS_DB = os.getenv("RESULTS_DB", "results.db")
+# The reconciler checks this many results per pass and how often it runs
+RECONCILE_BATCH = int(os.getenv("RESULTS_RECONCILE_BATCH", "500"))
+RECONCILE_INTERVAL = float(os.getenv("RESULTS_RECONCILE_INTERVAL", "60"))
+
+
+class ResultsRepository:
+    """Durable document analysis results, shared by every worker process.
+
+    Each result is stored as its JSON body plus the columns it is filtered on.
+    Results whose upload was deleted are hidden by a background reconciler
+    that stats a bounded batch per pass, so reads never touch the filesystem.
+    """
+
+    def __init__(self, db_path: str = RESULTS_DB):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                file_path TEXT,
+                sha256 TEXT,
+                department TEXT,
+                workflow_outcome TEXT,
+                summary TEXT,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_department ON results (deleted, department, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_outcome ON results (deleted, workflow_outcome, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON results (deleted, created_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_sha256 ON results (sha256)")
+        self._db.commit()
+        self._reconcile_after = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.counters = {"added": 0, "reconciled": 0, "removed": 0}
+
+    def add(self, result: dict, file_path: str = None, sha256: str = None) -> int:
+        with self._lock:
+            row_id = self._db.execute(
+                "INSERT INTO results (filename, file_path, sha256, department, workflow_outcome, summary, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    result.get("filename", ""),
+                    file_path,
+                    sha256,
+                    result.get("department"),
+                    result.get("workflow_outcome"),
+                    result.get("summary", ""),
+                    json.dumps(result, default=str),
+                    time.time(),
+                ),
+            ).lastrowid
+            self._db.commit()
+            self.counters["added"] += 1
+        return row_id
+
+    def _where(self, department, outcome, since, until, sha256):
+        where, params = ["deleted = 0"], []
+        for clause, value in (
+            ("department = ?", department),
+            ("workflow_outcome = ?", outcome),
+            ("created_at >= ?", since),
+            ("created_at < ?", until),
+            ("sha256 = ?", sha256),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        return where, params
+
+    def find(self, department: str = None, outcome: str = None, since: float = None, until: float = None,
+             sha256: str = None) -> list:
+        """Every live result matching the filters, oldest first."""
+        where, params = self._where(department, outcome, since, until, sha256)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT result FROM results WHERE {' AND '.join(where)} ORDER BY id", params
+            ).fetchall()
+        return [json.loads(row["result"]) for row in rows]
+
+    def page(self, department: str = None, outcome: str = None, since: float = None, until: float = None,
+             sha256: str = None, limit: int = 25, cursor: str = None) -> dict:
+        """One page of live results, newest first."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = self._where(department, outcome, since, until, sha256)
+        if cursor:
+            _, row_id = decode_cursor(cursor)
+            where.append("id < ?")
+            params.append(row_id)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, created_at, result FROM results WHERE {' AND '.join(where)} ORDER BY id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return {"items": [json.loads(row["result"]) for row in rows], "next_cursor": next_cursor}
+
+    def summaries(self, limit: int = None) -> list:
+        """Summaries of live results, oldest first; with limit, only the newest `limit` of them."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT summary FROM results WHERE deleted = 0 ORDER BY id DESC LIMIT ?",
+                (limit if limit is not None else -1,),
+            ).fetchall()
+        return [row["summary"] for row in reversed(rows)]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results WHERE deleted = 0").fetchone()[0]
+
+    # ------------------- RECONCILER -------------------
+    def reconcile(self, batch: int = RECONCILE_BATCH) -> list:
+        """Hide results whose upload no longer exists; checks one batch and remembers where it stopped.
+
+        Returns the content hashes left without any live result, whose search
+        and retrieval entries the caller should evict.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, file_path, sha256 FROM results WHERE deleted = 0 AND id > ? ORDER BY id LIMIT ?",
+                (self._reconcile_after, batch),
+            ).fetchall()
+        # Stat outside the lock so writers are not held up by slow disks
+        missing = [row for row in rows if row["file_path"] and not os.path.exists(row["file_path"])]
+        orphaned = []
+        with self._lock:
+            if missing:
+                self._db.executemany("UPDATE results SET deleted = 1 WHERE id = ?", [(row["id"],) for row in missing])
+                self._db.commit()
+                # The same content may still be live under another upload
+                for sha256 in sorted({row["sha256"] for row in missing if row["sha256"]}):
+                    if self._db.execute(
+                        "SELECT 1 FROM results WHERE sha256 = ? AND deleted = 0 LIMIT 1", (sha256,)
+                    ).fetchone() is None:
+                        orphaned.append(sha256)
+            # Wrap around once the end of the table is reached
+            self._reconcile_after = rows[-1]["id"] if len(rows) == batch else 0
+            self.counters["reconciled"] += len(rows)
+            self.counters["removed"] += len(missing)
+        return orphaned
+
+    def start_reconciler(self, interval: float = RECONCILE_INTERVAL, on_removed=None):
+        """Reconcile in the background; on_removed(sha256_list) evicts content that is no longer live."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    orphaned = self.reconcile()
+                    if orphaned and on_removed is not None:
+                        on_removed(orphaned)
+                except Exception as e:
+                    print(f"Results reconciler failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="results-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop_reconciler(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "reconcile_position": self._reconcile_after}
+
+
+results_repo = ResultsRepository()
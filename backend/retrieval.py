@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from llm_client import llm_client
+
+VECTOR_DB = os.getenv("VECTOR_DB", "vectors.db")
+RAG_CHUNK_CHARS = int(os.getenv("RAG_CHUNK_CHARS", "800"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "100"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+# Newest items sent instead when nothing relevant is indexed yet (or embedding is down)
+RAG_FALLBACK_ITEMS = int(os.getenv("RAG_FALLBACK_ITEMS", "20"))
+# Chunks are embedded this many per request
+RAG_EMBED_BATCH = int(os.getenv("RAG_EMBED_BATCH", "32"))
+
+
+def chunk_text(text: str, size: int = RAG_CHUNK_CHARS, overlap: int = RAG_CHUNK_OVERLAP) -> list:
+    """Split text into ~size character chunks on word boundaries, overlapping by ~overlap characters."""
+    words = text.split()
+    chunks, current, length = [], [], 0
+    for word in words:
+        if current and length + len(word) + 1 > size:
+            chunks.append(" ".join(current))
+            # Carry the tail of the chunk over so a sentence split at the edge is still found
+            carried, carried_length = [], 0
+            for previous in reversed(current):
+                if carried_length + len(previous) + 1 > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_length += len(previous) + 1
+            current, length = carried, carried_length
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class _Matrix:
+    """In-memory copy of one namespace's vectors, normalized for cosine search."""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.owners = np.empty(0, dtype=np.int64)
+        self.vectors = None
+        self.last_id = 0
+
+    def append(self, ids, owners, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)])
+        self.owners = np.concatenate([self.owners, np.asarray(owners, dtype=np.int64)])
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+        self.last_id = int(self.ids[-1])
+
+    def top_k(self, query, k: int, owner_id: int = None):
+        if self.vectors is None or query.shape[0] != self.vectors.shape[1]:
+            return []
+        scores = self.vectors @ query
+        if owner_id is not None:
+            scores = np.where(self.owners == owner_id, scores, -np.inf)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self.ids[i]), float(scores[i])) for i in best if np.isfinite(scores[i])]
+
+
+class VectorIndex:
+    """Chunk embeddings for retrieval, persisted in SQLite and searched in memory.
+
+    Namespaces keep documents and tickets apart; owner_id scopes a chunk to a
+    user (0 for shared content). Search is exact cosine similarity over a
+    NumPy matrix that is topped up with rows added by other workers before
+    each query.
+    """
+
+    def __init__(self, db_path: str = VECTOR_DB, client=llm_client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                model TEXT NOT NULL,
+                owner_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_namespace ON chunks (namespace, model, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (namespace, source)")
+        self._db.commit()
+        self._matrices = {}
+        self.counters = {"indexed_chunks": 0, "searches": 0}
+
+    def has_source(self, namespace: str, source: str) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM chunks WHERE namespace=? AND source=? LIMIT 1", (namespace, source)
+            ).fetchone() is not None
+
+    def add(self, namespace: str, source: str, text: str, owner_id: int = 0) -> int:
+        """Chunk, embed and store text under source, replacing what source held before. Returns the chunk count."""
+        chunks = chunk_text(text)
+        vectors = []
+        for start in range(0, len(chunks), RAG_EMBED_BATCH):
+            vectors.extend(self.client.embed(chunks[start:start + RAG_EMBED_BATCH]))
+        model = self.client.embed_model
+        now = time.time()
+        with self._lock:
+            replaced = self._db.execute(
+                "DELETE FROM chunks WHERE namespace=? AND source=?", (namespace, source)
+            ).rowcount
+            self._db.executemany(
+                "INSERT INTO chunks (namespace, model, owner_id, source, position, text, vector, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (namespace, model, owner_id, source, i, chunk, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                    for i, (chunk, vector) in enumerate(zip(chunks, vectors))
+                ],
+            )
+            self._db.commit()
+            if replaced:
+                # Replaced chunks may still sit in the matrix; rebuild it on next search
+                self._matrices.pop(namespace, None)
+            self.counters["indexed_chunks"] += len(chunks)
+        return len(chunks)
+
+    def remove(self, namespace: str, source: str) -> int:
+        """Drop every chunk stored under source. Returns the number removed."""
+        with self._lock:
+            removed = self._db.execute(
+                "DELETE FROM chunks WHERE namespace=? AND source=?", (namespace, source)
+            ).rowcount
+            self._db.commit()
+            if removed:
+                # The matrix only ever grows; rebuild it on next search
+                self._matrices.pop(namespace, None)
+        return removed
+
+    def search(self, namespace: str, query: str, k: int = RAG_TOP_K, owner_id: int = None) -> list:
+        """Top-k chunks most similar to query: [{"text", "source", "score"}]."""
+        query_vector = np.asarray(self.client.embed([query])[0], dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        with self._lock:
+            matrix = self._refresh(namespace)
+            hits = matrix.top_k(query_vector, k, owner_id)
+            self.counters["searches"] += 1
+            if not hits:
+                return []
+            rows = self._db.execute(
+                f"SELECT id, source, text FROM chunks WHERE id IN ({','.join('?' * len(hits))})",
+                [chunk_id for chunk_id, _ in hits],
+            ).fetchall()
+        by_id = {row["id"]: row for row in rows}
+        return [
+            {"text": by_id[chunk_id]["text"], "source": by_id[chunk_id]["source"], "score": round(score, 4)}
+            for chunk_id, score in hits
+            if chunk_id in by_id
+        ]
+
+    def _refresh(self, namespace: str) -> _Matrix:
+        # Caller holds the lock
+        matrix = self._matrices.setdefault(namespace, _Matrix())
+        rows = self._db.execute(
+            "SELECT id, owner_id, vector FROM chunks WHERE namespace=? AND model=? AND id > ? ORDER BY id",
+            (namespace, self.client.embed_model, matrix.last_id),
+        ).fetchall()
+        if rows:
+            matrix.append(
+                [row["id"] for row in rows],
+                [row["owner_id"] for row in rows],
+                np.stack([np.frombuffer(row["vector"], dtype=np.float32) for row in rows]),
+            )
+        return matrix
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "namespaces": {ns: len(m.ids) for ns, m in self._matrices.items()}}
+
+
+vector_index = VectorIndex()
+
+
+def format_context(hits: list) -> str:
+    return "\n---\n".join(hit["text"] for hit in hits)
@@ -0,0 +1,199 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+# Generations each Ollama backend runs at once; match OLLAMA_NUM_PARALLEL on the servers
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+# Generations in flight across all backends; unset means OLLAMA_NUM_PARALLEL per backend
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "0")) or None
+# Slots batch work may never take, so an interactive request never waits behind a whole batch
+LLM_INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "1"))
+# Waiting requests per class beyond which new ones are shed with 503
+LLM_QUEUE_LIMITS = {
+    name: int(os.getenv(f"LLM_QUEUE_LIMIT_{name.upper()}", str(default)))
+    for name, default in {"interactive": 64, "normal": 64, "batch": 512}.items()
+}
+# Waiting requests per user beyond which that user is shed with 429
+LLM_MAX_QUEUED_PER_USER = int(os.getenv("LLM_MAX_QUEUED_PER_USER", "8"))
+# Seconds from submission (queueing included) until a request is abandoned
+LLM_DEADLINES = {
+    name: float(os.getenv(f"LLM_DEADLINE_{name.upper()}", str(default)))
+    for name, default in {"interactive": 120, "normal": 300, "batch": 1800}.items()
+}
+
+_request = contextvars.ContextVar("llm_request", default=("normal", None))
+
+
+@contextmanager
+def llm_request(priority: str, user=None):
+    """Priority class and user for LLM calls made in this context (threads started by TaskGraph included)."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority {priority!r}")
+    token = _request.set((priority, user))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+def max_in_flight_for(backends: int) -> int:
+    """Scheduler capacity for a pool of backends: LLM_MAX_IN_FLIGHT if set, else OLLAMA_NUM_PARALLEL each."""
+    return LLM_MAX_IN_FLIGHT or OLLAMA_NUM_PARALLEL * max(1, backends)
+
+
+def current_request():
+    """(priority, user) set by the innermost llm_request, ("normal", None) outside one."""
+    return _request.get()
+
+
+class Rejected(Exception):
+    """The scheduler refused or gave up on a request; status_code is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "user", "deadline", "event", "granted")
+
+    def __init__(self, priority: str, user, deadline: float):
+        self.priority = priority
+        self.user = user
+        self.deadline = deadline
+        self.event = threading.Event()
+        self.granted = False
+
+
+class LLMScheduler:
+    """Admission control in front of the LLM backend.
+
+    At most max_in_flight generations run at once. Waiting requests are
+    served strictly by priority class, and round-robin across users within
+    a class so one user's bulk upload cannot starve everyone else's. Batch
+    work never takes the last `interactive_reserve` slots. Requests that
+    would wait in a full class queue (503) or exceed their user's share of
+    it (429) are rejected up front rather than queued, and a request still
+    waiting at its deadline is dropped.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = None,
+        interactive_reserve: int = LLM_INTERACTIVE_RESERVE,
+        queue_limits: dict = None,
+        max_queued_per_user: int = LLM_MAX_QUEUED_PER_USER,
+        deadlines: dict = None,
+    ):
+        self.max_in_flight = max(1, max_in_flight or max_in_flight_for(1))
+        self.interactive_reserve = min(interactive_reserve, self.max_in_flight - 1)
+        self.queue_limits = queue_limits or LLM_QUEUE_LIMITS
+        self.max_queued_per_user = max_queued_per_user
+        self.deadlines = deadlines or LLM_DEADLINES
+        self._lock = threading.Lock()
+        self._in_flight = {name: 0 for name in PRIORITIES}
+        # class -> user -> waiters; user order is the round-robin order
+        self._queues = {name: OrderedDict() for name in PRIORITIES}
+        self._queued = {name: 0 for name in PRIORITIES}
+        self.counters = {name: {"admitted": 0, "queued": 0, "shed_429": 0, "shed_503": 0, "expired": 0, "wait_seconds": 0.0}
+                         for name in PRIORITIES}
+
+    def deadline_for(self, priority: str) -> float:
+        return time.monotonic() + self.deadlines[priority]
+
+    def _total_in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def _can_run(self, priority: str) -> bool:
+        limit = self.max_in_flight - (self.interactive_reserve if priority == "batch" else 0)
+        return self._total_in_flight() < limit
+
+    def _waiting_ahead(self, priority: str) -> bool:
+        return any(self._queued[name] for name, rank in PRIORITIES.items() if rank <= PRIORITIES[priority])
+
+    def acquire(self, priority: str, user=None, deadline: float = None):
+        """Block until a slot is granted; raises Rejected when shed or past the deadline."""
+        deadline = deadline if deadline is not None else self.deadline_for(priority)
+        waiter = _Waiter(priority, user, deadline)
+        started = time.monotonic()
+        with self._lock:
+            counters = self.counters[priority]
+            if not self._waiting_ahead(priority) and self._can_run(priority):
+                self._in_flight[priority] += 1
+                counters["admitted"] += 1
+                return
+            if self._queued[priority] >= self.queue_limits[priority]:
+                counters["shed_503"] += 1
+                raise Rejected(f"LLM queue for {priority} requests is full", 503, retry_after=5)
+            users = self._queues[priority]
+            if len(users.get(user, ())) >= self.max_queued_per_user:
+                counters["shed_429"] += 1
+                raise Rejected("Too many LLM requests waiting for this user", 429, retry_after=5)
+            users.setdefault(user, deque()).append(waiter)
+            self._queued[priority] += 1
+            counters["queued"] += 1
+
+        waiter.event.wait(max(0.0, deadline - time.monotonic()))
+        with self._lock:
+            if not waiter.granted:
+                self._remove(waiter)
+                counters["expired"] += 1
+                raise Rejected(f"LLM request ({priority}) was not scheduled before its deadline", 503, retry_after=10)
+            counters["admitted"] += 1
+            counters["wait_seconds"] += time.monotonic() - started
+
+    def release(self, priority: str):
+        with self._lock:
+            self._in_flight[priority] -= 1
+            self._dispatch()
+
+    def _remove(self, waiter: _Waiter):
+        # Caller holds the lock
+        users = self._queues[waiter.priority]
+        waiters = users.get(waiter.user)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued[waiter.priority] -= 1
+            if not waiters:
+                del users[waiter.user]
+
+    def _dispatch(self):
+        # Caller holds the lock. Grant freed slots to the best waiters, in priority order.
+        now = time.monotonic()
+        for priority in sorted(PRIORITIES, key=PRIORITIES.get):
+            users = self._queues[priority]
+            while users and self._can_run(priority):
+                user, waiters = next(iter(users.items()))
+                waiter = waiters.popleft()
+                self._queued[priority] -= 1
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                if waiter.deadline <= now:
+                    # Its own wait() times out and reports the expiry
+                    continue
+                waiter.granted = True
+                self._in_flight[priority] += 1
+                waiter.event.set()
+            if users:
+                # Lower classes wait until this one is drained
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": dict(self._in_flight),
+                "queued": dict(self._queued),
+                "classes": {
+                    name: {**c, "wait_seconds": round(c["wait_seconds"], 3)} for name, c in self.counters.items()
+                },
+            }
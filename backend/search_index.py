@@ -0,0 +1,151 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+SEARCH_DB = os.getenv("SEARCH_DB", "search.db")
+# BM25 weight of a match in each field, relative to the body text
+SEARCH_BOOSTS = {
+    "title": float(os.getenv("SEARCH_BOOST_TITLE", "3.0")),
+    "summary": float(os.getenv("SEARCH_BOOST_SUMMARY", "2.0")),
+    "entities": float(os.getenv("SEARCH_BOOST_ENTITIES", "1.5")),
+    "body": float(os.getenv("SEARCH_BOOST_BODY", "1.0")),
+}
+FIELDS = ("title", "summary", "entities", "body")
+MAX_SEARCH_RESULTS = 100
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _match_expression(query: str) -> str:
+    # Quote every token so user input is never parsed as FTS5 syntax; OR lets
+    # BM25 rank documents matching more of the terms first
+    tokens = _TOKEN.findall(query.lower())
+    return " OR ".join(f'"{token}"' for token in dict.fromkeys(tokens))
+
+
+def _entities_text(entities) -> str:
+    if not entities:
+        return ""
+    if isinstance(entities, str):
+        return entities
+    return " ".join(
+        " ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+        for key, value in entities.items()
+        if key not in ("raw", "summary", "spans") and value
+    )
+
+
+class SearchIndex:
+    """Keyword search over documents and tickets, ranked with BM25 (SQLite FTS5).
+
+    Each indexed item has a title, summary, entities and body field, weighted
+    by SEARCH_BOOSTS. Items are upserted one at a time as they are ingested
+    and the index lives on disk, so every worker process searches the same data.
+    """
+
+    def __init__(self, db_path: str = SEARCH_DB, boosts: dict = None):
+        self.boosts = {**SEARCH_BOOSTS, **(boosts or {})}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS search_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                ref TEXT NOT NULL,
+                owner_id INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, ref)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_search_items_owner ON search_items (owner_id, kind)")
+        self._db.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5({', '.join(FIELDS)}, tokenize='unicode61')"
+        )
+        self._db.commit()
+        self.counters = {"indexed": 0, "searches": 0}
+
+    def index(self, kind: str, ref, title: str = "", summary: str = "", entities=None, body: str = "",
+              owner_id: int = 0):
+        """Add or replace one item; kind + ref identify it."""
+        values = (title or "", summary or "", _entities_text(entities), body or "")
+        with self._lock:
+            row = self._db.execute("SELECT id FROM search_items WHERE kind=? AND ref=?", (kind, str(ref))).fetchone()
+            if row is None:
+                item_id = self._db.execute(
+                    "INSERT INTO search_items (kind, ref, owner_id, updated_at) VALUES (?, ?, ?, ?)",
+                    (kind, str(ref), owner_id, time.time()),
+                ).lastrowid
+            else:
+                item_id = row["id"]
+                self._db.execute(
+                    "UPDATE search_items SET owner_id=?, updated_at=? WHERE id=?", (owner_id, time.time(), item_id)
+                )
+                self._db.execute("DELETE FROM search_fts WHERE rowid=?", (item_id,))
+            self._db.execute(
+                f"INSERT INTO search_fts (rowid, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?)", (item_id, *values)
+            )
+            self._db.commit()
+            self.counters["indexed"] += 1
+
+    def remove(self, kind: str, ref):
+        with self._lock:
+            row = self._db.execute("SELECT id FROM search_items WHERE kind=? AND ref=?", (kind, str(ref))).fetchone()
+            if row is not None:
+                self._db.execute("DELETE FROM search_fts WHERE rowid=?", (row["id"],))
+                self._db.execute("DELETE FROM search_items WHERE id=?", (row["id"],))
+                self._db.commit()
+
+    def search(self, query: str, kinds: tuple = None, user_id: int = None, limit: int = 10) -> list:
+        """Best matches first: [{"kind", "ref", "title", "summary", "snippet", "score"}].
+
+        Shared items (owner 0) are always visible; owned items only to
+        user_id. A higher score is a better match.
+        """
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+        where = ["search_fts MATCH ?"]
+        params = [expression]
+        if kinds:
+            where.append(f"i.kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        if user_id is None:
+            where.append("i.owner_id = 0")
+        else:
+            where.append("i.owner_id IN (0, ?)")
+            params.append(user_id)
+        weights = ", ".join(str(self.boosts[field]) for field in FIELDS)
+        sql = (
+            f"SELECT i.kind, i.ref, f.title, f.summary, bm25(search_fts, {weights}) AS rank, "
+            f"snippet(search_fts, {FIELDS.index('body')}, '[', ']', '...', 12) AS snippet "
+            f"FROM search_fts f JOIN search_items i ON i.id = f.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY rank LIMIT ?"
+        )
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit]).fetchall()
+            self.counters["searches"] += 1
+        # FTS5 reports BM25 negated so that ascending order is best-first
+        return [
+            {
+                "kind": row["kind"],
+                "ref": row["ref"],
+                "title": row["title"],
+                "summary": row["summary"],
+                "snippet": row["snippet"],
+                "score": round(-row["rank"], 6),
+            }
+            for row in rows
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = self._db.execute("SELECT kind, COUNT(*) AS n FROM search_items GROUP BY kind").fetchall()
+            return {**self.counters, "items": {row["kind"]: row["n"] for row in items}}
+
+
+search_index = SearchIndex()
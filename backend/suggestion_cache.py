@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from fingerprints import simhash, hamming, bands, normalize_issue
+
+SUGGESTION_DB = os.getenv("SUGGESTION_DB", "suggestions.db")
+# Descriptions whose fingerprints differ in at most this many bits share a suggestion (max 3)
+SUGGESTION_MAX_DISTANCE = min(int(os.getenv("SUGGESTION_MAX_DISTANCE", "3")), 3)
+# Older entries are still served but regenerated in the background
+SUGGESTION_REFRESH_AGE = float(os.getenv("SUGGESTION_REFRESH_AGE", str(7 * 24 * 3600)))
+# Older entries are not served at all
+SUGGESTION_MAX_AGE = float(os.getenv("SUGGESTION_MAX_AGE", str(30 * 24 * 3600)))
+SUGGESTION_MAX_ENTRIES = int(os.getenv("SUGGESTION_MAX_ENTRIES", "20000"))
+# Descriptions with fewer content words say too little to be matched safely
+SUGGESTION_MIN_WORDS = int(os.getenv("SUGGESTION_MIN_WORDS", "2"))
+# Curated answers for the most common repeats, served before the learned entries.
+# Format: {"templates": [{"name", "category", "keywords", "suggestion"}]} where
+# keywords is a list of word groups and each group needs one word in the ticket.
+SUGGESTION_TEMPLATES = os.getenv(
+    "SUGGESTION_TEMPLATES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "suggestion_templates.json")
+)
+
+
+def load_templates(path: str = SUGGESTION_TEMPLATES) -> list:
+    """Templates from the library file; a missing file means no templates."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        templates = json.load(f).get("templates", [])
+    return [
+        {**t, "keywords": [frozenset(w.lower() for w in group) for group in t["keywords"]]}
+        for t in templates
+    ]
+
+
+class SuggestionCache:
+    """IT suggestions stored per ticket category and SimHash of the description.
+
+    A lookup first tries the template library, then finds the closest
+    stored description of the same category within SUGGESTION_MAX_DISTANCE
+    bits. The four 16-bit bands of each
+    fingerprint are indexed, so candidates come from an index probe rather
+    than a scan. Entries past the refresh age are served and reported as
+    stale so the caller can queue a regeneration.
+    """
+
+    def __init__(self, db_path: str = SUGGESTION_DB, templates: list = None):
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._puts_since_trim = 0
+        self.templates = load_templates() if templates is None else templates
+        self.counters = {"template_hits": 0, "exact_hits": 0, "near_hits": 0, "misses": 0, "skipped": 0,
+                         "stale_served": 0, "stores": 0, "refreshes": 0}
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS suggestions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                band0 INTEGER NOT NULL,
+                band1 INTEGER NOT NULL,
+                band2 INTEGER NOT NULL,
+                band3 INTEGER NOT NULL,
+                description TEXT NOT NULL,
+                suggestion TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                refreshed_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL
+            )
+        """)
+        for i in range(4):
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_suggestions_band{i} ON suggestions (category, band{i})")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_last_hit ON suggestions (last_hit_at)")
+        self._db.commit()
+
+    def _closest(self, category: str, fingerprint: int, now: float):
+        # Caller holds the lock
+        b = bands(fingerprint)
+        rows = self._db.execute(
+            """SELECT id, fingerprint, description, suggestion, refreshed_at FROM suggestions
+               WHERE category=? AND (band0=? OR band1=? OR band2=? OR band3=?) AND refreshed_at > ?""",
+            (category, *b, now - SUGGESTION_MAX_AGE),
+        ).fetchall()
+        best, best_distance = None, SUGGESTION_MAX_DISTANCE + 1
+        for row in rows:
+            distance = hamming(fingerprint, int(row["fingerprint"], 16))
+            if distance < best_distance:
+                best, best_distance = row, distance
+        return best, best_distance
+
+    def _template(self, category: str, words: list):
+        words = set(words)
+        for template in self.templates:
+            if template["category"] == category and all(group & words for group in template["keywords"]):
+                return template
+        return None
+
+    def lookup(self, category: str, description: str):
+        """(suggestion, entry_id, stale) for a near-duplicate of description, or None.
+
+        entry_id is None when the answer came from the template library.
+        """
+        words = normalize_issue(description)
+        if len(words) < SUGGESTION_MIN_WORDS:
+            with self._lock:
+                self.counters["skipped"] += 1
+            return None
+        template = self._template(category, words)
+        if template is not None:
+            with self._lock:
+                self.counters["template_hits"] += 1
+            return template["suggestion"], None, False
+        fingerprint = simhash(description)
+        now = time.time()
+        with self._lock:
+            row, distance = self._closest(category, fingerprint, now)
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["exact_hits" if distance == 0 else "near_hits"] += 1
+            self._db.execute("UPDATE suggestions SET hits=hits+1, last_hit_at=? WHERE id=?", (now, row["id"]))
+            self._db.commit()
+            stale = now - row["refreshed_at"] > SUGGESTION_REFRESH_AGE
+            if stale:
+                self.counters["stale_served"] += 1
+            return row["suggestion"], row["id"], stale
+
+    def store(self, category: str, description: str, suggestion: str):
+        """Remember a freshly generated suggestion; a near-duplicate entry is updated instead."""
+        if not suggestion or len(normalize_issue(description)) < SUGGESTION_MIN_WORDS:
+            return None
+        fingerprint = simhash(description)
+        now = time.time()
+        with self._lock:
+            row, _ = self._closest(category, fingerprint, now)
+            if row is not None:
+                self._db.execute("UPDATE suggestions SET suggestion=?, refreshed_at=? WHERE id=?",
+                                 (suggestion, now, row["id"]))
+                self._db.commit()
+                return row["id"]
+            cursor = self._db.execute(
+                """INSERT INTO suggestions (category, fingerprint, band0, band1, band2, band3, description,
+                                            suggestion, created_at, refreshed_at, last_hit_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (category, f"{fingerprint:016x}", *bands(fingerprint), description, suggestion, now, now, now),
+            )
+            self._db.commit()
+            self.counters["stores"] += 1
+            self._puts_since_trim += 1
+            if self._puts_since_trim >= 100:
+                self._trim(now)
+            return cursor.lastrowid
+
+    def claim_refresh(self, entry_id: int):
+        """(category, description) to regenerate, or None if a refresh is already under way."""
+        with self._lock:
+            if entry_id in self._refreshing:
+                return None
+            row = self._db.execute("SELECT category, description FROM suggestions WHERE id=?", (entry_id,)).fetchone()
+            if row is None:
+                return None
+            self._refreshing.add(entry_id)
+            return row["category"], row["description"]
+
+    def refresh(self, entry_id: int, suggestion: str = None):
+        """Store the regenerated suggestion (None when regeneration failed) and release the claim."""
+        with self._lock:
+            self._refreshing.discard(entry_id)
+            if suggestion:
+                self._db.execute("UPDATE suggestions SET suggestion=?, refreshed_at=? WHERE id=?",
+                                 (suggestion, time.time(), entry_id))
+                self._db.commit()
+                self.counters["refreshes"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["template_hits"] + self.counters["exact_hits"] + self.counters["near_hits"]
+            lookups = hits + self.counters["misses"]
+            entries = self._db.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "templates": len(self.templates),
+                "refreshing": len(self._refreshing),
+            }
+
+    def _trim(self, now: float):
+        # Caller holds the lock
+        self._puts_since_trim = 0
+        self._db.execute("DELETE FROM suggestions WHERE refreshed_at <= ?", (now - SUGGESTION_MAX_AGE,))
+        self._db.execute("""
+            DELETE FROM suggestions WHERE id IN (
+                SELECT id FROM suggestions ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (SUGGESTION_MAX_ENTRIES,))
+        self._db.commit()
+
+
+suggestion_cache = SuggestionCache()
@@ -0,0 +1,79 @@
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+TASK_GRAPH_WORKERS = int(os.getenv("TASK_GRAPH_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(max_workers=TASK_GRAPH_WORKERS, thread_name_prefix="step")
+
+
+class TaskGraph:
+    """Per-request step graph: independent steps run in parallel, dependent ones chain.
+
+    Each step is a callable that receives the results of its dependencies as
+    positional arguments, in the order they were declared:
+
+        graph = TaskGraph("create_ticket")
+        graph.add("category", classify_ticket, args=(description,))
+        graph.add("suggestion", lambda category: generate_it_suggestion(category, description), "category")
+        results = graph.run()
+
+    run() prints one timing line per request so the step graph shows up in
+    the logs.
+    """
+
+    def __init__(self, name: str, executor: ThreadPoolExecutor = None):
+        self.name = name
+        self.executor = executor or _executor
+        self.steps = {}
+        self.timings = {}
+        self.failed_step = None
+
+    def add(self, name: str, fn, *deps, args: tuple = ()):
+        if name in self.steps:
+            raise ValueError(f"Duplicate step: {name}")
+        for dep in deps:
+            if dep not in self.steps:
+                raise ValueError(f"Step {name} depends on unknown step {dep}")
+        self.steps[name] = (fn, deps, args)
+        return self
+
+    def run(self) -> dict:
+        results = {}
+        running = {}
+        pending = dict(self.steps)
+        started = time.perf_counter()
+
+        def timed(step, fn, call_args):
+            t0 = time.perf_counter()
+            try:
+                return fn(*call_args)
+            finally:
+                self.timings[step] = round((time.perf_counter() - t0) * 1000, 1)
+
+        try:
+            while pending or running:
+                for step, (fn, deps, args) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        call_args = tuple(args) + tuple(results[dep] for dep in deps)
+                        # Steps see the caller's context variables (LLM priority and user)
+                        context = contextvars.copy_context()
+                        running[self.executor.submit(context.run, timed, step, fn, call_args)] = step
+                        del pending[step]
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    if future.exception() is not None:
+                        self.failed_step = step
+                    results[step] = future.result()
+        except Exception:
+            for future in running:
+                future.cancel()
+            raise
+        finally:
+            self.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+            print(f"[{self.name}] " + " ".join(f"{k}={v}ms" for k, v in self.timings.items()))
+
+        return results
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Module-level stores must not write databases into the working directory
+os.environ.setdefault("SUGGESTION_DB", ":memory:")
+os.environ.setdefault("LLM_CACHE_DB", ":memory:")
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory):
+    """The FastAPI app module, imported with its local stores in a scratch directory."""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("mysql.connector")
+    pytest.importorskip("bcrypt")
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        import main
+    finally:
+        os.chdir(cwd)
+    return main
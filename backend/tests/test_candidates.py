@@ -0,0 +1,50 @@
+import pytest
+
+from candidates import normalize_role, parse_job_matches, search
+
+
+@pytest.mark.parametrize("spelling", [
+    "Frontend Developer", "frontend developer", "  Front-end Developer ", "FRONT END developer", "Frontend-Developer",
+])
+def test_spellings_of_a_known_role_share_one_key(spelling):
+    assert normalize_role(spelling) == "frontend developer"
+
+
+def test_unknown_roles_are_trimmed_and_lower_cased():
+    assert normalize_role("  Site  Reliability Engineer ") == "site reliability engineer"
+
+
+def test_job_matches_are_keyed_on_the_normalized_role():
+    reply = '''Here you go:
+    [{"role": "Front-end Developer", "match": 72, "fit": "Medium"},
+     {"role": "Frontend Developer", "match": 85, "fit": "High"},
+     {"role": "ui/ux designer", "match": 60, "fit": "Medium"}]'''
+    assert parse_job_matches(reply) == [
+        {"role": "frontend developer", "score": 85, "fit": "High"},
+        {"role": "ui/ux designer", "score": 60, "fit": "Medium"},
+    ]
+
+
+class RecordingDB:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def execute(self, sql, params):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def test_search_looks_up_the_normalized_role():
+    db = RecordingDB()
+    search(db, 7, " Front-End developer ")
+    sql, params = db.executed[0]
+    assert "cr.role = %s" in sql
+    assert params[:2] == [7, "frontend developer"]
@@ -0,0 +1,81 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from entity_extraction import entity_extractor, entities_dict, parse_amount
+
+
+def amounts(text):
+    return entities_dict(entity_extractor.extract(text))["amounts"]
+
+
+def dates(text):
+    return entities_dict(entity_extractor.extract(text))["dates"]
+
+
+@pytest.mark.parametrize("text", [
+    "works 40 hours 5 days a week",
+    "Our customers 1 and 2 reported it",
+    "The engineers 3 and 4 are on leave",
+    "all 12 fingerprints 7 times",
+    "sinr 5 dB on the link",
+    "I have 3 kids",
+])
+def test_prose_with_digits_has_no_amounts(text):
+    assert amounts(text) == []
+
+
+def test_customers_number_does_not_trip_amount_rules():
+    # A spurious "rs 75000" used to exceed the Finance approval threshold
+    assert amounts("Feedback from customers 75000 times") == []
+
+
+@pytest.mark.parametrize("text,expected,currency", [
+    ("Pay Rs. 1,200.50 now", "Rs. 1,200.50", "INR"),
+    ("Total: INR 5000", "INR 5000", "INR"),
+    ("costs USD 20", "USD 20", "USD"),
+    ("₹75,000 due", "₹75,000", "INR"),
+    ("fee of 300 dollars", "300 dollars", "USD"),
+])
+def test_currency_amounts(text, expected, currency):
+    entities = [e for e in entity_extractor.extract(text) if e.kind == "amount"]
+    assert [e.text for e in entities] == [expected]
+    assert entities[0].currency == currency
+
+
+def test_invoice_and_date_digits_are_not_amounts():
+    found = entities_dict(entity_extractor.extract("Invoice INV-2024-001 dated 2024-03-05, amount due 1,500"))
+    assert found["invoice_numbers"] == ["INV-2024-001"]
+    assert found["dates"] == ["2024-03-05"]
+    assert found["amounts"] == ["1,500"]
+
+
+def test_iso_date_out_of_range_is_rejected():
+    assert dates("due 2025-13-01") == []
+
+
+def test_iso_date_is_never_swapped():
+    assert dates("due 2025-01-13") == ["2025-01-13"]
+
+
+def test_numeric_date_is_day_first():
+    assert dates("due 05/03/2024") == ["2024-03-05"]
+
+
+def test_numeric_date_falls_back_to_month_first():
+    assert dates("due 12/25/2024") == ["2024-12-25"]
+
+
+def test_named_month_dates():
+    assert dates("signed 3rd March, 2024 and March 4, 2024") == ["2024-03-03", "2024-03-04"]
+
+
+def test_date_values_are_dates():
+    entity = entity_extractor.extract("on 2024-02-29")[0]
+    assert entity.value == date(2024, 2, 29)
+
+
+def test_parse_amount():
+    assert parse_amount("₹75,000") == Decimal("75000")
+    assert parse_amount("no number") is None
@@ -0,0 +1,31 @@
+from fast_path import FAST_PATH_THRESHOLD, invoice_summary, try_rules
+
+WITH_VENDOR = """INVOICE
+Vendor: Acme Supplies Pvt Ltd
+Invoice No: INV-2024-042
+Date: 12/03/2024
+Total: Rs. 45,000
+"""
+
+WITHOUT_VENDOR = """Please find the invoice attached.
+Invoice No: INV-2024-042
+Date: 12/03/2024
+Total: Rs. 45,000
+"""
+
+
+def test_templated_invoice_skips_the_llm():
+    summary, confidence = invoice_summary(WITH_VENDOR)
+    assert confidence >= FAST_PATH_THRESHOLD
+    assert summary.startswith("Invoice INV-2024-042 from Acme Supplies Pvt Ltd")
+
+
+def test_number_amount_and_date_without_vendor_stay_below_threshold():
+    summary, confidence = invoice_summary(WITHOUT_VENDOR)
+    assert summary is not None
+    assert confidence < FAST_PATH_THRESHOLD
+    assert try_rules("document_summary_test", lambda: invoice_summary(WITHOUT_VENDOR)) is None
+
+
+def test_documents_not_about_invoices_score_zero():
+    assert invoice_summary("Total: Rs. 45,000 paid on 12/03/2024") == (None, 0.0)
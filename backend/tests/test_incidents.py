@@ -0,0 +1,46 @@
+import threading
+
+from incidents import IncidentIndex
+
+CATEGORY = "Network & Connectivity"
+
+
+def test_duplicate_joins_the_open_incident():
+    index = IncidentIndex()
+    first, opened = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office")
+    second, joined_opened = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office 10:15")
+    assert opened and not joined_opened
+    assert second is first and first.tickets == 2
+
+
+def test_other_category_opens_its_own_incident():
+    index = IncidentIndex()
+    first, _ = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office")
+    other, opened = index.assign("Hardware Issues", "VPN disconnects every few minutes from the Pune office")
+    assert opened and other is not first
+
+
+def test_duplicate_receives_only_the_suggestion():
+    index = IncidentIndex()
+    incident, _ = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office")
+    duplicate, _ = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office")
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(duplicate.wait(timeout=5)))
+    waiter.start()
+    incident.resolve("Reinstall the VPN client")
+    waiter.join(5)
+    assert waited == ["Reinstall the VPN client"]
+    assert "summary" not in incident.to_dict()
+
+
+def test_abandoned_incident_releases_waiters_and_stops_matching():
+    index = IncidentIndex()
+    incident, _ = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office")
+    index.abandon(incident)
+    assert incident.wait(timeout=1) is None
+    fresh, opened = index.assign(CATEGORY, "VPN disconnects every few minutes from the Pune office")
+    assert opened and fresh is not incident
+
+
+def test_short_descriptions_are_not_clustered():
+    assert IncidentIndex().assign(CATEGORY, "VPN down") == (None, False)
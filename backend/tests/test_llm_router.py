@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scheduler
+from llm_client import LLMClient, LLMError
+from llm_router import LLMRouter
+from scheduler import LLMScheduler
+
+
+class StubOllama:
+    """Local HTTP server answering /api/tags and /api/generate like Ollama."""
+
+    def __init__(self, models=("llama3:latest",)):
+        self.models = list(models)
+        self.healthy = True
+        self.failing = False
+        self.gate = threading.Event()
+        self.gate.set()
+        self.generated = []
+        self.active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path != "/api/tags" or not stub.healthy:
+                    return self._json(500, {"error": "unavailable"})
+                self._json(200, {"models": [{"name": m} for m in stub.models]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.generated.append(payload["model"])
+                    stub.active += 1
+                try:
+                    if stub.failing:
+                        return self._json(500, {"error": "model crashed"})
+                    stub.gate.wait(5)
+                    lines = [{"response": "ok", "done": False}, {"response": "", "done": True}]
+                    data = "".join(json.dumps(line) + "\n" for line in lines).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.gate.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    created = []
+
+    def make(*models):
+        stub = StubOllama(models or ("llama3:latest",))
+        created.append(stub)
+        return stub
+
+    yield make
+    for stub in created:
+        stub.close()
+
+
+@pytest.fixture
+def clients():
+    created = []
+
+    def make(router):
+        client = LLMClient(router, max_retries=0, retry_backoff=0,
+                           scheduler=LLMScheduler(max_in_flight=16, interactive_reserve=0))
+        created.append(client)
+        return client
+
+    yield make
+    for client in created:
+        client.close()
+
+
+def wait_until(predicate, timeout=5):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+def test_requests_go_to_the_backend_with_fewest_outstanding(stubs, clients):
+    a, b = stubs(), stubs()
+    client = clients(LLMRouter([a.url, b.url], task_models={}))
+    a.gate.clear()
+    b.gate.clear()
+    threads = [threading.Thread(target=client.generate, args=(f"prompt {i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: a.active + b.active == 4)
+    assert (a.active, b.active) == (2, 2)
+    a.gate.set()
+    b.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert [backend["outstanding"] for backend in client.router.stats()["backends"]] == [0, 0]
+
+
+def test_least_outstanding_prefers_the_idle_backend(stubs):
+    a, b = stubs(), stubs()
+    router = LLMRouter([a.url, b.url], task_models={})
+    busy = router.acquire("llama3")
+    assert router.acquire("llama3") is not busy
+
+
+def test_backend_is_ejected_after_consecutive_failures(stubs, clients):
+    a, b = stubs(), stubs()
+    a.failing = True
+    router = LLMRouter([a.url, b.url], task_models={}, eject_after=2, eject_seconds=60)
+    client = clients(router)
+    for i in range(8):
+        try:
+            client.generate(f"prompt {i}")
+        except LLMError:
+            pass
+    assert len(a.generated) == 2
+    assert len(b.generated) == 6
+    stats = {backend["url"]: backend for backend in router.stats()["backends"]}
+    assert stats[a.url]["ejected"] and stats[a.url]["ejections"] == 1
+    assert not stats[b.url]["ejected"]
+
+
+def test_health_check_readmits_a_backend_once_its_ejection_runs_out(stubs, clients):
+    a, b = stubs(), stubs()
+    router = LLMRouter([a.url, b.url], task_models={}, eject_seconds=0.2)
+    client = clients(router)
+    a.healthy = False
+    router.check_all()
+    assert not router.backends[0].healthy
+    for i in range(4):
+        client.generate(f"prompt {i}")
+    assert a.generated == []
+
+    a.healthy = True
+    router.check_all()
+    # Still inside its ejection: a good check alone does not re-admit it
+    assert not router.backends[0].healthy
+    time.sleep(0.25)
+    router.check_all()
+    assert router.backends[0].healthy
+    for i in range(4):
+        client.generate(f"again {i}")
+    assert len(a.generated) == 2
+
+
+def test_task_types_are_routed_to_a_backend_serving_their_model(stubs, clients):
+    big = stubs("llama3:latest")
+    small = stubs("llama3:latest", "llama3.2:1b")
+    router = LLMRouter([big.url, small.url], task_models={"extraction": "llama3.2:1b"})
+    client = clients(router)
+    router.check_all()
+    for i in range(4):
+        client.generate(f"extract {i}", task="extraction")
+    assert big.generated == []
+    assert small.generated == ["llama3.2:1b"] * 4
+    client.generate("summarize", task="summary")
+    assert "llama3" in big.generated + small.generated
+
+
+def test_scheduler_capacity_scales_with_the_backends(stubs, clients, monkeypatch):
+    monkeypatch.setattr(scheduler, "LLM_MAX_IN_FLIGHT", None)
+    monkeypatch.setattr(scheduler, "OLLAMA_NUM_PARALLEL", 4)
+    urls = [stubs().url for _ in range(3)]
+    client = LLMClient(LLMRouter(urls, task_models={}))
+    try:
+        assert client.scheduler.max_in_flight == 12
+    finally:
+        client.close()
+    monkeypatch.setattr(scheduler, "LLM_MAX_IN_FLIGHT", 5)
+    assert scheduler.max_in_flight_for(3) == 5
@@ -0,0 +1,34 @@
+from results_repo import ResultsRepository
+
+
+def result(filename):
+    return {"filename": filename, "department": "Finance", "workflow_outcome": "Process Normally", "summary": "s"}
+
+
+def test_reconcile_hides_results_whose_upload_is_gone(tmp_path):
+    repo = ResultsRepository(":memory:")
+    kept, gone = tmp_path / "kept.pdf", tmp_path / "gone.pdf"
+    kept.write_text("x")
+    repo.add(result("kept.pdf"), str(kept), "aaa")
+    repo.add(result("gone.pdf"), str(gone), "bbb")
+    assert repo.reconcile() == ["bbb"]
+    assert [r["filename"] for r in repo.find()] == ["kept.pdf"]
+    assert repo.stats()["removed"] == 1
+
+
+def test_content_still_live_under_another_upload_is_not_evicted(tmp_path):
+    repo = ResultsRepository(":memory:")
+    kept = tmp_path / "kept.pdf"
+    kept.write_text("x")
+    repo.add(result("copy.pdf"), str(tmp_path / "gone.pdf"), "aaa")
+    repo.add(result("kept.pdf"), str(kept), "aaa")
+    assert repo.reconcile() == []
+    assert [r["filename"] for r in repo.find()] == ["kept.pdf"]
+
+
+def test_evicted_documents_leave_search_and_retrieval(main_module, monkeypatch):
+    removed = []
+    monkeypatch.setattr(main_module.search_index, "remove", lambda kind, ref: removed.append((kind, ref)))
+    monkeypatch.setattr(main_module.vector_index, "remove", lambda namespace, source: removed.append((namespace, source)))
+    main_module._evict_documents(["bbb"])
+    assert removed == [("document", "bbb"), ("documents", "bbb")]
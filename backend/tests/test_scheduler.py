@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import LLMScheduler, Rejected
+
+
+def wait_until(predicate, timeout=5):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def queued(sched, priority):
+    return sched.stats()["queued"][priority]
+
+
+def in_background(sched, order, priority, user=None):
+    """Acquire in a thread, note the grant and release straight away."""
+    def run():
+        sched.acquire(priority, user)
+        order.append((priority, user))
+        sched.release(priority)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_batch_never_takes_the_interactive_reserve():
+    sched = LLMScheduler(max_in_flight=2, interactive_reserve=1)
+    sched.acquire("batch")
+    with pytest.raises(Rejected) as rejected:
+        sched.acquire("batch", deadline=time.monotonic() + 0.05)
+    assert rejected.value.status_code == 503
+    sched.acquire("interactive")
+    assert sched.stats()["in_flight"] == {"interactive": 1, "normal": 0, "batch": 1}
+
+
+def test_freed_slots_go_to_higher_classes_first():
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0)
+    sched.acquire("normal")
+    order, threads = [], []
+    for priority in ("batch", "normal", "interactive"):
+        threads.append(in_background(sched, order, priority))
+        wait_until(lambda: queued(sched, priority) == 1)
+    sched.release("normal")
+    for thread in threads:
+        thread.join(5)
+    assert [priority for priority, _ in order] == ["interactive", "normal", "batch"]
+
+
+def test_users_take_turns_within_a_class():
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0)
+    sched.acquire("normal")
+    order, threads = [], []
+    for count, user in enumerate(("alice", "alice", "bob"), 1):
+        threads.append(in_background(sched, order, "normal", user))
+        wait_until(lambda: queued(sched, "normal") == count)
+    sched.release("normal")
+    for thread in threads:
+        thread.join(5)
+    assert [user for _, user in order] == ["alice", "bob", "alice"]
+
+
+def test_user_over_their_queue_share_gets_429():
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0, max_queued_per_user=1)
+    sched.acquire("normal")
+    order = []
+    thread = in_background(sched, order, "normal", "alice")
+    wait_until(lambda: queued(sched, "normal") == 1)
+    with pytest.raises(Rejected) as rejected:
+        sched.acquire("normal", "alice")
+    assert rejected.value.status_code == 429
+    assert sched.stats()["classes"]["normal"]["shed_429"] == 1
+    sched.release("normal")
+    thread.join(5)
+    assert order == [("normal", "alice")]
+
+
+def test_full_class_queue_gets_503():
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0,
+                         queue_limits={"interactive": 1, "normal": 1, "batch": 1})
+    sched.acquire("normal")
+    thread = in_background(sched, [], "normal", "alice")
+    wait_until(lambda: queued(sched, "normal") == 1)
+    with pytest.raises(Rejected) as rejected:
+        sched.acquire("normal", "bob")
+    assert rejected.value.status_code == 503
+    sched.release("normal")
+    thread.join(5)
+
+
+def test_request_still_waiting_at_its_deadline_expires():
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0)
+    sched.acquire("normal")
+    with pytest.raises(Rejected) as rejected:
+        sched.acquire("normal", deadline=time.monotonic() + 0.05)
+    assert rejected.value.status_code == 503
+    stats = sched.stats()
+    assert stats["queued"]["normal"] == 0
+    assert stats["classes"]["normal"]["expired"] == 1
+    sched.release("normal")
+    assert sched.stats()["in_flight"]["normal"] == 0
+
+
+def test_grant_racing_the_timeout_is_admitted(monkeypatch):
+    # The slot is granted after the wait has timed out but before the waiter
+    # takes the lock again; it must run, or the granted slot would leak.
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0)
+    sched.acquire("normal")
+
+    class RacingEvent(threading.Event):
+        def wait(self, timeout=None):
+            sched.release("normal")
+            return False
+
+    class RacingWaiter(scheduler._Waiter):
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.event = RacingEvent()
+
+    monkeypatch.setattr(scheduler, "_Waiter", RacingWaiter)
+    sched.acquire("normal")
+    stats = sched.stats()
+    assert stats["in_flight"]["normal"] == 1
+    assert stats["classes"]["normal"]["expired"] == 0
+    sched.release("normal")
+    assert sched.stats()["in_flight"]["normal"] == 0
+
+
+def test_expired_waiter_is_skipped_when_a_slot_frees():
+    sched = LLMScheduler(max_in_flight=1, interactive_reserve=0)
+    sched.acquire("normal")
+    expired = []
+
+    def late():
+        try:
+            sched.acquire("normal", "alice", deadline=time.monotonic() + 0.05)
+        except Rejected:
+            expired.append(True)
+
+    # Hold the lock so the late waiter cannot remove itself before release() dispatches
+    late_thread = threading.Thread(target=late, daemon=True)
+    late_thread.start()
+    wait_until(lambda: queued(sched, "normal") == 1)
+    with sched._lock:
+        time.sleep(0.1)
+        sched._in_flight["normal"] -= 1
+        sched._dispatch()
+    late_thread.join(5)
+    assert expired == [True]
+    assert sched.stats()["in_flight"]["normal"] == 0
@@ -0,0 +1,60 @@
+import pytest
+
+from fingerprints import normalize_issue, simhash
+from suggestion_cache import SuggestionCache, load_templates
+
+
+@pytest.mark.parametrize("text", [
+    "Outlook cannot connect to the server",
+    "Outlook can't connect to the server",
+    "Outlook can’t connect to the server",
+])
+def test_negations_are_kept(text):
+    assert normalize_issue(text) == ["outlook", "not", "connect", "server"]
+
+
+def test_negated_ticket_has_a_different_fingerprint():
+    assert simhash("Outlook cannot connect to the server") != simhash("Outlook can connect to the server")
+
+
+def test_contractions_become_not():
+    assert "not" in normalize_issue("VPN won't start")
+    assert "not" in normalize_issue("Printer doesn't print")
+
+
+@pytest.fixture
+def cache():
+    return SuggestionCache(":memory:", templates=load_templates())
+
+
+def test_negated_ticket_is_not_served_the_positive_answer(cache):
+    cache.store("Email & Communication", "Outlook can connect to the server but mail is slow", "Check the mailbox size")
+    assert cache.lookup("Email & Communication", "Outlook cannot connect to the server but mail is slow") is None
+
+
+def test_near_duplicate_is_served_from_the_cache(cache):
+    cache.store("Email & Communication", "Outlook keeps crashing on startup", "Start Outlook in safe mode")
+    suggestion, entry_id, stale = cache.lookup("Email & Communication", "Outlook keeps crashing on startup 10:42")
+    assert suggestion == "Start Outlook in safe mode"
+    assert entry_id is not None and not stale
+
+
+@pytest.mark.parametrize("category, description", [
+    ("Network & Connectivity", "VPN is down since this morning"),
+    ("Password & Authentication", "My password expired"),
+    ("Password & Authentication", "Account locked after failed login attempts"),
+    ("Hardware Issues", "Printer offline on floor 3"),
+])
+def test_common_repeats_come_from_the_template_library(cache, category, description):
+    suggestion, entry_id, stale = cache.lookup(category, description)
+    assert suggestion and entry_id is None and not stale
+    assert cache.stats()["template_hits"] == 1
+
+
+def test_template_needs_every_keyword_group_and_its_category(cache):
+    assert cache.lookup("Network & Connectivity", "How do I install the VPN client") is None
+    assert cache.lookup("Hardware Issues", "VPN is down since this morning") is None
+
+
+def test_missing_template_file_means_no_templates(tmp_path):
+    assert load_templates(str(tmp_path / "missing.json")) == []
@@ -0,0 +1,17 @@
+from incidents import IncidentIndex
+
+DESCRIPTION = "VPN disconnects every few minutes from the Pune office"
+
+
+def test_disconnect_after_category_event_abandons_the_incident(main_module, monkeypatch):
+    index = IncidentIndex()
+    monkeypatch.setattr(main_module, "incident_index", index)
+    monkeypatch.setattr(main_module, "_ticket_context", lambda user_id, ticket_type, affected_user: "")
+
+    events = main_module._ticket_stream_events(1, DESCRIPTION, None, "self")
+    assert next(events).startswith("event: category")
+    incident = index.active()[0]
+    events.close()
+
+    duplicate, opened = index.assign(main_module.classify_ticket(DESCRIPTION), DESCRIPTION)
+    assert opened and duplicate.id != incident["id"]
@@ -0,0 +1,161 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from charset_normalizer import from_path
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+# PDFs with at least this many pages are split across pool workers
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+_process_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound parsing (pdfplumber, python-docx)."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False)
+        _process_pool = None
+
+
+class ExtractionError(Exception):
+    """Carries the JSON error body returned to the client."""
+
+    def __init__(self, body: dict):
+        super().__init__(body.get("error"))
+        self.body = body
+
+
+# ------------------- PER-TYPE EXTRACTORS -------------------
+# Each extractor returns (text, meta); meta carries what the content store keeps
+def _extract_txt(file_path: str, filename: str, max_chars: int = None):
+    detected = from_path(file_path).best()
+    if not detected:
+        return "", {}
+    return str(detected), {"encoding": detected.encoding}
+
+
+def _extract_pdf(file_path: str, filename: str, max_chars: int = None):
+    import pdfplumber
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            page_count = len(pdf.pages)
+            if page_count == 0:
+                raise ExtractionError({"error": f"PDF {filename} has no readable pages"})
+            parts = []
+            length = 0
+            for page in pdf.pages:
+                page_text = page.extract_text() or ""
+                parts.append(page_text)
+                length += len(page_text) + 1
+                # Callers that only use a prefix do not need the remaining pages
+                if max_chars is not None and length >= max_chars:
+                    break
+            text = " ".join(parts)
+    except ExtractionError:
+        raise
+    except Exception as pdf_error:
+        raise ExtractionError({"error": f"PDF processing failed for {filename}", "details": str(pdf_error)})
+    if not text.strip():
+        raise ExtractionError({"error": f"PDF {filename} contains no extractable text"})
+    return text, {"page_count": page_count}
+
+
+def _extract_docx(file_path: str, filename: str, max_chars: int = None):
+    from docx import Document
+    doc = Document(file_path)
+    parts = []
+    length = 0
+    for p in doc.paragraphs:
+        parts.append(p.text)
+        length += len(p.text) + 1
+        if max_chars is not None and length >= max_chars:
+            break
+    return " ".join(parts), {}
+
+
+EXTRACTORS = {
+    ".txt": _extract_txt,
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+}
+
+
+def extract_text(file_path: str, filename: str, max_chars: int = None):
+    """Extract text from a saved upload.
+
+    Returns (text, error, meta): error is a JSON body or None, meta holds the
+    detected encoding and/or page count when known.
+
+    With max_chars set, parsing stops once that many characters are available
+    and the text is cut to max_chars. Top-level and side-effect free so it can
+    run in the process pool.
+    """
+    extension = os.path.splitext(filename.lower().strip())[1]
+    extractor = EXTRACTORS.get(extension)
+    text, meta = "", {}
+    try:
+        if extractor is not None:
+            text, meta = extractor(file_path, filename, max_chars)
+    except ExtractionError as e:
+        return "", e.body, {}
+    except Exception as e:
+        return "", {"error": f"Failed to read {filename}", "details": str(e)}, {}
+
+    if not text.strip():
+        return "", {"error": "No readable text found", "filename": filename}, meta
+    if max_chars is not None:
+        text = text[:max_chars]
+    return text, None, meta
+
+
+# ------------------- PAGE-PARALLEL PDF -------------------
+def pdf_page_count(file_path: str) -> int:
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> list:
+    """Text of pages [start, end) of a PDF; runs in a pool worker."""
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:end]]
+
+
+def _extract_pdf_parallel(pool: ProcessPoolExecutor, file_path: str, filename: str, page_count: int):
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    futures = [pool.submit(extract_pdf_pages, file_path, start, end) for start, end in ranges]
+    try:
+        pages = [page for future in futures for page in future.result()]
+    except Exception as pdf_error:
+        return "", {"error": f"PDF processing failed for {filename}", "details": str(pdf_error)}, {}
+    text = " ".join(pages)
+    if not text.strip():
+        return "", {"error": f"PDF {filename} contains no extractable text"}, {}
+    return text, None, {"page_count": page_count}
+
+
+def extract_text_pooled(file_path: str, filename: str, max_chars: int = None):
+    """extract_text() run in the process pool, blocking the calling thread.
+
+    Large PDFs that are needed in full are split into page ranges and
+    extracted by several workers at once.
+    """
+    pool = get_process_pool()
+    if filename.lower().strip().endswith(".pdf") and max_chars is None:
+        try:
+            page_count = pool.submit(pdf_page_count, file_path).result()
+        except Exception:
+            page_count = 0  # let extract_text report the failure
+        if page_count >= PDF_PARALLEL_MIN_PAGES:
+            return _extract_pdf_parallel(pool, file_path, filename, page_count)
+    return pool.submit(extract_text, file_path, filename, max_chars).result()
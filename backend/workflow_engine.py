@@ -1,205 +1,224 @@
-def generate_workflow(department: str, extracted: dict) -> dict:
-    """Apply Infosys-specific rules and return workflow suggestions."""
+import json
+import os
+import threading
+import time
+from decimal import Decimal
 
-    if department == "Finance":
-        amounts = extracted.get("amounts", [])
-        amount_num = 0
-        if amounts:
-            # Prefer values with currency or thousand separators; parse all and take the largest
-            def parse_amount(value: str) -> int:
-                try:
-                    cleaned = (
-                        value.replace("₹", "").replace("$", "").replace(",", "").strip()
-                    )
-                    # handle decimals by taking integer part for thresholding
-                    return int(cleaned.split(".")[0])
-                except Exception:
-                    return 0
-
-            # Sort candidates to prefer those that look like currency amounts
-            prioritized = sorted(
-                amounts,
-                key=lambda v: (1 if ("₹" in v or "$" in v or "," in v) else 0, parse_amount(v)),
-                reverse=True,
-            )
-            amount_num = max(parse_amount(v) for v in prioritized)
-
-        if amount_num > 50000:
-            return {
-                "outcome": "Approval Required",
-                "checklist": [
-                    "Escalate to Finance Manager",
-                    "Log in SAP",
-                    "Schedule Payment"
-                ]
-            }
-        else:
-            return {"outcome": "Process Normally", "checklist": ["Schedule Payment"]}
-
-    elif department == "Customer Support":
-        raw_text = extracted.get("raw", "")
-        return {
-            "outcome": "Escalation Needed" if "High" in raw_text else "Normal Ticket",
-            "checklist": [
-                "Create ServiceNow Ticket",
-                "Notify Project Manager",
-                "Draft Apology Email"
-            ]
-        }
-
-    elif department == "Legal":
-        missing = extracted.get("missing_clauses", [])
-        if missing:
-            return {
-                "outcome": "Legal Review Required",
-                "checklist": [f"Add {c} Clause" for c in missing] + ["Route to Legal"]
-            }
-        else:
-            return {"outcome": "Contract OK", "checklist": ["Archive in Legal System"]}
-
-    elif department == "HR":
-        # Get the raw text content for analysis
-        raw_text = extracted.get("raw", "")
-        if not raw_text:
-            raw_text = extracted.get("summary", "")
-        
-        # Convert to lowercase for analysis
-        text_lower = raw_text.lower()
-        
-        # Check for resignation/exit feedback
-        if any(word in text_lower for word in ["resign", "quit", "leaving", "exit", "termination", "fired", "dismissed", "separation"]):
-            return {
-                "outcome": "Employee Exit Process",
-                "checklist": [
-                    "Schedule exit interview within 48 hours",
-                    "Collect company assets and access cards",
-                    "Process final settlement and benefits",
-                    "Update HRIS and remove system access",
-                    "Conduct knowledge transfer session"
-                ]
-            }
-        
-        # Check for harassment/complaint issues
-        elif any(word in text_lower for word in ["harassment", "discrimination", "bullying", "inappropriate", "uncomfortable", "threat", "abuse", "hostile", "toxic"]):
-            return {
-                "outcome": "Serious Complaint - Immediate Investigation",
-                "checklist": [
-                    "Escalate to HRBP and Legal team immediately",
-                    "Document all details and evidence",
-                    "Schedule investigation meeting within 24 hours",
-                    "Notify senior management",
-                    "Consider temporary suspension if needed",
-                    "Follow company harassment policy strictly"
-                ]
-            }
-        
-        # Check for positive feedback
-        elif any(word in text_lower for word in ["positive", "good", "excellent", "satisfied", "appreciate", "benefits", "improved", "higher", "increased", "enhanced", "valued", "respected", "motivated", "engagement", "collaboration", "teamwork", "productivity", "retention", "innovation", "unity", "happy", "great", "wonderful", "amazing", "fantastic"]):
-            return {
-                "outcome": "Positive Feedback - Recognition",
-                "checklist": [
-                    "Archive positive feedback in HR system",
-                    "Share with relevant manager for recognition",
-                    "Consider for employee recognition program",
-                    "Document as positive culture indicator",
-                    "Follow up with employee to express appreciation"
-                ]
-            }
-        
-        # Check for urgent/negative issues
-        elif any(word in text_lower for word in ["urgent", "critical", "immediate", "high", "burnout", "frustration", "stress", "disengagement", "attrition", "overworked", "underappreciated", "fatigue", "exploited", "emergency", "crisis", "severe", "serious"]):
-            return {
-                "outcome": "Immediate Action Required",
-                "checklist": [
-                    "Escalate to HRBP within 24 hours",
-                    "Schedule urgent 1:1 meeting",
-                    "Document incident in HR system",
-                    "Notify relevant manager immediately",
-                    "Assess if immediate intervention needed",
-                    "Consider temporary workload adjustment"
-                ]
-            }
-        
-        # Check for salary/compensation issues
-        elif any(word in text_lower for word in ["salary", "pay", "compensation", "bonus", "increment", "raise", "wage", "money", "financial", "benefits", "insurance", "pension"]):
-            return {
-                "outcome": "Compensation Review Required",
-                "checklist": [
-                    "Review current compensation structure",
-                    "Compare with market benchmarks",
-                    "Schedule meeting with employee",
-                    "Consult with compensation team",
-                    "Prepare compensation proposal",
-                    "Follow up within 2 weeks"
-                ]
-            }
-        
-        # Check for work-life balance issues
-        elif any(word in text_lower for word in ["work-life", "balance", "overtime", "flexible", "remote", "home", "family", "personal", "time", "schedule", "hours"]):
-            return {
-                "outcome": "Work-Life Balance Review",
-                "checklist": [
-                    "Review current work schedule and policies",
-                    "Discuss flexible work options",
-                    "Assess workload distribution",
-                    "Consider remote work possibilities",
-                    "Schedule follow-up in 1 week",
-                    "Monitor improvement over next month"
-                ]
-            }
-        
-        # Check for training/development needs
-        elif any(word in text_lower for word in ["training", "development", "learning", "skill", "course", "certification", "growth", "career", "advancement", "promotion", "mentoring"]):
-            return {
-                "outcome": "Training & Development Plan",
-                "checklist": [
-                    "Assess current skill gaps",
-                    "Identify relevant training programs",
-                    "Create development plan",
-                    "Assign mentor if needed",
-                    "Schedule regular progress reviews",
-                    "Track development milestones"
-                ]
-            }
-        
-        # Check for moderate concerns
-        elif any(word in text_lower for word in ["negative", "concern", "issue", "problem", "imbalance", "frustration", "uneven", "workload", "morale", "low", "communication", "trust", "absenteeism", "dissatisfied", "unhappy", "disappointed"]):
-            return {
-                "outcome": "Follow-up Needed",
-                "checklist": [
-                    "Schedule 1:1 meeting this week",
-                    "Document concerns in HR system",
-                    "Identify root cause of issues",
-                    "Create action plan with employee",
-                    "Follow up in 2 weeks",
-                    "Monitor progress monthly"
-                ]
-            }
-        
-        # Check for general feedback
-        elif any(word in text_lower for word in ["feedback", "suggestion", "idea", "improvement", "process", "system", "policy", "procedure", "workflow"]):
-            return {
-                "outcome": "General Feedback - Process Review",
-                "checklist": [
-                    "Review feedback for process improvements",
-                    "Share with relevant department heads",
-                    "Evaluate feasibility of suggestions",
-                    "Schedule feedback discussion",
-                    "Implement approved changes",
-                    "Follow up on implementation"
-                ]
-            }
-        
-        # Default case - neutral feedback
-        else:
+from entity_extraction import parse_amount
+from keyword_rules import KeywordMatcher
+
+WORKFLOW_RULES = os.getenv("WORKFLOW_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "workflow_rules.json"))
+# How often (seconds) the rules file's mtime is checked for changes
+WORKFLOW_RELOAD_INTERVAL = float(os.getenv("WORKFLOW_RELOAD_INTERVAL", "2"))
+
+# Rules file format: {"departments": {dept: [rule, ...]}, "default": rule}. A
+# rule is {"name", "when"?, "outcome", "checklist"}; the first rule of the
+# department whose "when" holds wins, and a rule without "when" always holds.
+# "when" is {"field", "op", "value"} with op one of max_amount_gt, contains,
+# not_empty or any_keyword; a list of fields means the first non-empty one.
+# Checklist items are strings or {"for_each": field, "template": "... {} ..."}.
+
+
+class WorkflowRulesError(Exception):
+    """The rules file could not be loaded or compiled."""
+
+
+def _max_amount(amounts) -> Decimal:
+    values = [parse_amount(str(a)) for a in amounts or []]
+    return max((v for v in values if v is not None), default=Decimal(0))
+
+
+def _field_value(extracted: dict, field):
+    if isinstance(field, list):
+        for name in field:
+            value = extracted.get(name)
+            if value:
+                return value
+        return None
+    return extracted.get(field)
+
+
+# ------------------- COMPILATION -------------------
+def _compile_condition(when: dict, rule_name: str, keyword_rules: list):
+    op, field, value = when.get("op"), when.get("field"), when.get("value")
+    if field is None:
+        raise WorkflowRulesError(f"Rule {rule_name}: 'when' needs a field")
+    if op == "max_amount_gt":
+        threshold = Decimal(str(value))
+        return lambda record, scan: _max_amount(_field_value(record, field)) > threshold
+    if op == "contains":
+        needle = str(value)
+        return lambda record, scan: needle in (_field_value(record, field) or "")
+    if op == "not_empty":
+        return lambda record, scan: bool(_field_value(record, field))
+    if op == "any_keyword":
+        if not isinstance(value, list) or not value:
+            raise WorkflowRulesError(f"Rule {rule_name}: any_keyword needs a list of keywords")
+        # Keyword rules of a department share one matcher and one scan per record
+        keyword_rules.append((rule_name, value))
+        key = json.dumps(field)
+        return lambda record, scan: rule_name in scan(key, field)
+    raise WorkflowRulesError(f"Rule {rule_name}: unknown op {op!r}")
+
+
+def _compile_checklist(items: list, rule_name: str):
+    static = all(isinstance(item, str) for item in items)
+    if static:
+        checklist = list(items)
+        return lambda record: list(checklist)
+    for item in items:
+        if not isinstance(item, str) and not ({"for_each", "template"} <= set(item)):
+            raise WorkflowRulesError(f"Rule {rule_name}: checklist items are strings or for_each/template objects")
+
+    def render(record):
+        out = []
+        for item in items:
+            if isinstance(item, str):
+                out.append(item)
+            else:
+                out.extend(item["template"].format(v) for v in record.get(item["for_each"]) or [])
+        return out
+
+    return render
+
+
+def _compile_rule(rule: dict, keyword_rules: list):
+    name = rule.get("name")
+    if not name or "outcome" not in rule:
+        raise WorkflowRulesError(f"Every rule needs a name and an outcome: {rule}")
+    condition = _compile_condition(rule["when"], name, keyword_rules) if rule.get("when") else None
+    return name, condition, rule["outcome"], _compile_checklist(rule.get("checklist", []), name)
+
+
+class _CompiledRules:
+    """Department -> ordered predicates, plus one KeywordMatcher per department."""
+
+    def __init__(self, config: dict):
+        if not isinstance(config.get("departments"), dict):
+            raise WorkflowRulesError("Rules file needs a 'departments' mapping")
+        self.version = config.get("version")
+        self.departments = {}
+        self.matchers = {}
+        names = set()
+        for department, rules in config["departments"].items():
+            keyword_rules = []
+            compiled = [_compile_rule(rule, keyword_rules) for rule in rules]
+            self.departments[department] = compiled
+            if keyword_rules:
+                self.matchers[department] = KeywordMatcher(keyword_rules)
+            names.update(name for name, *_ in compiled)
+        self.default = _compile_rule(config.get("default") or {"name": "default", "outcome": "General Processing"}, [])
+        self.rule_names = sorted(names | {self.default[0]})
+
+    def evaluate(self, department: str, extracted: dict):
+        matcher = self.matchers.get(department)
+        scans = {}
+
+        def scan(key, field):
+            # Text fields are scanned once per record, however many keyword rules read them
+            if key not in scans:
+                scans[key] = matcher.scan(_field_value(extracted, field) or "")
+            return scans[key]
+
+        for name, condition, outcome, checklist in self.departments.get(department, ()):
+            if condition is None or condition(extracted, scan):
+                return name, {"outcome": outcome, "checklist": checklist(extracted)}
+        name, _, outcome, checklist = self.default
+        return name, {"outcome": outcome, "checklist": checklist(extracted)}
+
+
+def _load_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise WorkflowRulesError("PyYAML is required for YAML workflow rules") from e
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class WorkflowEngine:
+    """Evaluates workflow rules from a JSON (or YAML) file, reloading it when it changes.
+
+    A file that fails to load or compile is reported and the previous rules
+    stay in effect, so a bad edit never takes routing down.
+    """
+
+    def __init__(self, path: str = WORKFLOW_RULES, reload_interval: float = WORKFLOW_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self.hits = {}
+        self.reloads = 0
+        self.last_error = None
+        self._rules = self._compile()
+
+    def _compile(self) -> _CompiledRules:
+        mtime = os.path.getmtime(self.path)
+        rules = _CompiledRules(_load_file(self.path))
+        self._mtime = mtime
+        return rules
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.reload_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError as e:
+                self.last_error = str(e)
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                self._rules = self._compile()
+                self.reloads += 1
+                self.last_error = None
+                print(f"Reloaded workflow rules from {self.path}")
+            except Exception as e:
+                # Report a bad file once, not on every check
+                self._mtime = mtime
+                self.last_error = str(e)
+                print(f"Keeping previous workflow rules, reload failed: {e}")
+
+    def evaluate(self, department: str, extracted: dict) -> dict:
+        return self.evaluate_many([(department, extracted)])[0]
+
+    def evaluate_many(self, records) -> list:
+        """Workflow for each (department, extracted) pair, all against the same rules snapshot."""
+        self._maybe_reload()
+        rules = self._rules
+        results, hits = [], {}
+        for department, extracted in records:
+            name, workflow = rules.evaluate(department, extracted or {})
+            hits[name] = hits.get(name, 0) + 1
+            results.append(workflow)
+        with self._lock:
+            for name, count in hits.items():
+                self.hits[name] = self.hits.get(name, 0) + count
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
             return {
-                "outcome": "Neutral Feedback - Monitor",
-                "checklist": [
-                    "Archive in HR system for reference",
-                    "Monitor for patterns or trends",
-                    "Include in quarterly HR review",
-                    "No immediate action required"
-                ]
+                "path": self.path,
+                "version": self._rules.version,
+                "reloads": self.reloads,
+                "last_error": self.last_error,
+                "hits": {name: self.hits.get(name, 0) for name in self._rules.rule_names},
             }
 
-    return {"outcome": "General Processing", "checklist": []}
+
+workflow_engine = WorkflowEngine()
+
+
+def generate_workflow(department: str, extracted: dict) -> dict:
+    """Apply Infosys-specific rules and return workflow suggestions."""
+    return workflow_engine.evaluate(department, extracted)
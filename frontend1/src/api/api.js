@@ -34,10 +34,24 @@ export const uploadFile = async (file, userId) => {
   return response.data;
 };
 
+// -------------------- BATCH UPLOAD --------------------
+// Accepts many documents and/or .zip archives in one request
+export const uploadBatch = async (files) => {
+  const formData = new FormData();
+  for (const file of files) {
+    formData.append("files", file);
+  }
+
+  const response = await axios.post(`${API_URL}/upload/batch/`, formData, {
+    headers: { "Content-Type": "multipart/form-data" },
+  });
+  return response.data;
+};
+
 // -------------------- FETCH RESULTS --------------------
-export const fetchResults = async (userId) => {
+export const fetchResults = async (department) => {
   const response = await axios.get(`${API_URL}/results/`, {
-    params: { user_id: userId },
+    params: { department },
   });
   return response.data;
 };
@@ -62,6 +76,48 @@ export const createTicket = async (userId, description) => {
   return response.data;
 };
 
+// -------------------- STREAMING (SSE) --------------------
+// Posts a form to one of the /stream/ endpoints and calls onEvent(event, data)
+// for every Server-Sent Event as it arrives.
+export const streamForm = async (path, formData, onEvent) => {
+  const res = await fetch(`${API_URL}${path}`, { method: "POST", body: formData });
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+};
+
+export const streamCreateTicket = (userId, description, onEvent) => {
+  const formData = new FormData();
+  formData.append("user_id", userId);
+  formData.append("description", description);
+  return streamForm("/create_ticket/stream/", formData, onEvent);
+};
+
+export const streamQueryDocs = (question, onEvent) => {
+  const formData = new FormData();
+  formData.append("question", question);
+  return streamForm("/query/stream/", formData, onEvent);
+};
+
 // -------------------- FETCH TICKETS (New) --------------------
 export const fetchTickets = async (userId) => {
   const response = await axios.get(`${API_URL}/tickets/`, {
@@ -70,6 +126,15 @@ export const fetchTickets = async (userId) => {
   return response.data;
 };
 
+// -------------------- FETCH TICKETS PAGE --------------------
+// Pass the returned next_cursor back in to get the following page
+export const fetchTicketsPage = async (userId, { cursor, limit, status, category, fields } = {}) => {
+  const response = await axios.get(`${API_URL}/tickets/page/`, {
+    params: { user_id: userId, cursor, limit, status, category, fields },
+  });
+  return response.data;
+};
+
 // -------------------- QUERY TICKET (New) --------------------
 export const queryTicket = async (userId, question) => {
   const formData = new FormData();
@@ -164,12 +229,24 @@ export const fetchResumes = async (userId) => {
   return response.data;
 };
 
+// -------------------- FETCH RESUMES PAGE --------------------
+export const fetchResumesPage = async (userId, { cursor, limit, status, fields } = {}) => {
+  const response = await axios.get(`${API_URL}/resumes/page/`, {
+    params: { user_id: userId, cursor, limit, status, fields },
+  });
+  return response.data;
+};
+
 // -------------------- SEARCH CANDIDATES (New) --------------------
-export const searchCandidates = async (userId, jobRole, minExperience) => {
+// Returns { items, next_cursor }; items are ranked by match score
+export const searchCandidates = async (userId, jobRole, minExperience, { skills, cursor, limit } = {}) => {
   const formData = new FormData();
   formData.append("user_id", userId);
   formData.append("job_role", jobRole);
   formData.append("min_experience", minExperience);
+  if (skills) formData.append("skills", skills);
+  if (cursor) formData.append("cursor", cursor);
+  if (limit) formData.append("limit", limit);
 
   const response = await axios.post(`${API_URL}/search_candidates/`, formData);
   return response.data;
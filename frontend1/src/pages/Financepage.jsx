@@ -38,7 +38,7 @@ export default function Financepage() {
 
   const loadResults = async () => {
     try {
-      const data = await fetchResults();
+      const data = await fetchResults("Finance");
       setResults(data || []);
     } catch (e) {
       console.error("Failed to load results", e);
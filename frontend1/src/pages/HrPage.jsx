@@ -21,7 +21,7 @@ export default function HrPage() {
   // Load original HR results
   const loadResults = async () => {
     try {
-      const data = await fetchResults();
+      const data = await fetchResults("HR");
       setResults(data || []);
     } catch (e) {
       console.error("Failed to load results", e);
@@ -101,7 +101,7 @@ export default function HrPage() {
     
     try {
       const res = await searchCandidates(user.id, searchJobRole, minExperience);
-      setSearchResults(res);
+      setSearchResults(res.items);
     } catch (err) {
       console.error("Failed to search candidates:", err);
       alert("Search failed");